@@ -1,5 +1,7 @@
 from multiprocessing import Process, freeze_support
-from web.testpage import app
+import argparse
+import importlib.util
+import os
 import uvicorn
 
 
@@ -8,6 +10,58 @@ def main() -> None:
     uvicorn.run("web.testpage:app", host="0.0.0.0", port=8000, reload=True)
 
 
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = None,
+) -> None:
+    """
+    生产环境入口：多 worker、无文件监听
+
+    主进程先执行一次建表，再由 uvicorn 启动 worker 进程共享监听 socket。
+    收到 SIGTERM/SIGINT 后停止接收新连接，等待在途请求完成（最多
+    MATE_GRACEFUL_TIMEOUT 秒），随后每个 worker 在 shutdown 阶段调用
+    shutdown_database 释放连接池。
+
+    :param host: 监听地址
+    :param port: 监听端口
+    :param workers: worker 进程数，默认读取 MATE_WORKERS，否则取 CPU 核数
+    """
+    from database.lifetime import bootstrap_database
+
+    if workers is None:
+        workers = int(os.environ.get("MATE_WORKERS", os.cpu_count() or 1))
+
+    # 有 uvloop/httptools 时使用，否则退回标准实现
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+    bootstrap_database()
+
+    uvicorn.run(
+        "web.testpage:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        reload=False,
+        access_log=False,
+        backlog=int(os.environ.get("MATE_BACKLOG", 2048)),
+        timeout_keep_alive=int(os.environ.get("MATE_KEEPALIVE_TIMEOUT", 15)),
+        timeout_graceful_shutdown=int(os.environ.get("MATE_GRACEFUL_TIMEOUT", 30)),
+    )
+
+
 if __name__ == "__main__":
-    freeze_support() 
-    main()
+    freeze_support()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prod", action="store_true", help="多 worker 生产模式")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if args.prod:
+        serve(host=args.host, port=args.port, workers=args.workers)
+    else:
+        main()
@@ -0,0 +1,12 @@
+"""
+活动 API 性能测试套件
+
+- python -m benchmarks.handlers                 逐个接口的微基准（ASGI 客户端，不经过网络）
+- python -m benchmarks.feed                     50 张卡片的信息流：批量详情 vs 逐个请求详情
+- python -m benchmarks.load --duration 20       混合负载（读/创建/评价/审核），输出 p50/p95/p99 与吞吐
+- python -m benchmarks.load --save baseline.json     保存基线
+- python -m benchmarks.load --compare baseline.json  与基线对比，退化超过阈值时返回非零退出码
+- locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000   对真实服务压测（需安装 locust）
+
+所有基准均在临时 SQLite 数据库上运行，数据由 benchmarks.datagen 生成。
+"""
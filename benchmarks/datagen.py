@@ -0,0 +1,100 @@
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from database.schedule import rebuild_schedule
+from schema.database import Event, EventContent, EventRating
+from schema.timeutil import utcnow
+
+STATUSES = ["created", "pending", "approved", "finished", "cancelled", "rejected"]
+THEMES = ["户外运动", "摄影", "桌游", "美食", "徒步"]
+LOCATIONS = ["西山森林公园", "奥林匹克公园", "798艺术区", "后海", "香山"]
+
+
+@dataclass
+class Dataset:
+    activity_ids: List[str] = field(default_factory=list)
+    user_ids: List[str] = field(default_factory=list)
+    pending_ids: List[str] = field(default_factory=list)
+
+
+def generate(
+    engine: Engine,
+    events: int = 1000,
+    ratings_per_event: int = 5,
+    participants_per_event: int = 4,
+    users: int = 200,
+    seed: int = 0,
+) -> Dataset:
+    """
+    批量写入合成数据
+
+    :param engine: 目标数据库引擎（表结构需已创建）
+    :param events: 活动数量
+    :param ratings_per_event: 每个活动的评价数
+    :param participants_per_event: 每个活动的参与者数（含创建者）
+    :param users: 用户池大小
+    :param seed: 随机种子，保证可复现
+    :return: 生成的 ID 集合，供压测脚本选取请求参数
+    """
+    rng = random.Random(seed)
+    now = utcnow()
+    data = Dataset(user_ids=[f"user_{i:05d}" for i in range(users)])
+
+    event_rows, content_rows, rating_rows = [], [], []
+    for i in range(events):
+        activity_id = f"a{i:06x}"
+        members = rng.sample(data.user_ids, min(participants_per_event, users))
+        raters = rng.sample(data.user_ids, min(ratings_per_event, users))
+        status = rng.choice(STATUSES)
+        created_at = now - timedelta(days=rng.randint(0, 365))
+        ratings = [round(rng.uniform(1, 5), 1) for _ in raters]
+        rating_ids = [f"f{i:06x}{j:02x}" for j in range(len(raters))]
+
+        data.activity_ids.append(activity_id)
+        if status == "pending":
+            data.pending_ids.append(activity_id)
+        event_rows.append(dict(
+            activity_id=activity_id,
+            owner_id=members[0],
+            participants_id=members,
+            status=status,
+            created_at=created_at,
+            updated_at=created_at,
+            rating=sum(ratings) / len(ratings) if ratings else None,
+            rating_id=rating_ids,
+        ))
+        content_rows.append(dict(
+            activity_id=activity_id,
+            title=f"活动 {i}",
+            description="合成数据" * 10,
+            start_time=created_at + timedelta(days=rng.randint(1, 30), hours=rng.randint(0, 23)),
+            duration=rng.choice([1.0, 2.0, 3.5, 4.5]),
+            theme=rng.choice(THEMES),
+            location=rng.choice(LOCATIONS),
+            budget=rng.randint(0, 1000),
+            group_size=rng.randint(2, 20),
+            recommended_equipment=["登山杖", "防晒霜"],
+            activity_tags=["合成", "压测"],
+        ))
+        for rating_id, rater_id, rating in zip(rating_ids, raters, ratings):
+            rating_rows.append(dict(
+                rating_id=rating_id,
+                status="submitted",
+                submitted_at=created_at + timedelta(days=1),
+                activity_id=activity_id,
+                rating=rating,
+                rater_id=rater_id,
+                comment="不错",
+            ))
+
+    with engine.begin() as conn:
+        if event_rows:
+            conn.execute(insert(Event.__table__), event_rows)
+            conn.execute(insert(EventContent.__table__), content_rows)
+        if rating_rows:
+            conn.execute(insert(EventRating.__table__), rating_rows)
+        rebuild_schedule(conn)
+    return data
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from benchmarks.harness import add_gate_arguments, bench_app, report, summarize
+
+
+async def run(feeds: int, cards: int, events: int, ratings: int, warmup: int = 5) -> dict:
+    """
+    渲染一屏信息流所需的详情：一次批量请求 vs 逐个请求（顺序 / 并发）
+
+    每个场景的一次采样 = 取回 cards 个活动的详情。
+    """
+    rng = random.Random(42)
+    async with bench_app(events=events, ratings_per_event=ratings) as (app, client, data):
+        params = {"user_id": data.user_ids[0], "token": "t"}
+
+        async def batch(ids):
+            response = await client.post("/api/activities/batch-details", json={**params, "activity_ids": ids})
+            return [response]
+
+        async def sequential(ids):
+            return [await client.get(f"/api/activities/{i}/details", params=params) for i in ids]
+
+        async def concurrent(ids):
+            return await asyncio.gather(*(client.get(f"/api/activities/{i}/details", params=params) for i in ids))
+
+        results = {}
+        for name, fetch in (("batch", batch), ("individual_sequential", sequential), ("individual_concurrent", concurrent)):
+            for _ in range(warmup):
+                await fetch(rng.sample(data.activity_ids, cards))
+            latencies, errors = [], 0
+            start = time.perf_counter()
+            for _ in range(feeds):
+                ids = rng.sample(data.activity_ids, cards)
+                begin = time.perf_counter()
+                responses = await fetch(ids)
+                latencies.append((time.perf_counter() - begin) * 1000)
+                errors += sum(1 for r in responses if r.status_code >= 500)
+            results[name] = summarize(latencies, time.perf_counter() - start, errors)
+    return {
+        "meta": {"suite": "feed", "feeds": feeds, "cards": cards, "events": events, "ratings_per_event": ratings},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="信息流详情加载基准")
+    parser.add_argument("--feeds", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=50)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--ratings", type=int, default=5)
+    add_gate_arguments(parser)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.feeds, args.cards, args.events, args.ratings))
+    sys.exit(report(results, args))
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from benchmarks.harness import HANDLER_OPS, add_gate_arguments, bench_app, report, summarize, timed
+
+
+async def run(iterations: int, events: int, ratings: int, warmup: int = 20) -> dict:
+    """逐个接口顺序请求，测量单请求延迟"""
+    results = {}
+    rng = random.Random(42)
+    async with bench_app(events=events, ratings_per_event=ratings) as (app, client, data):
+        for name, op in HANDLER_OPS.items():
+            for _ in range(warmup):
+                await op(client, data, rng)
+            latencies, errors = [], 0
+            start = time.perf_counter()
+            for _ in range(iterations):
+                elapsed_ms, ok = await timed(op, client, data, rng)
+                latencies.append(elapsed_ms)
+                errors += 0 if ok else 1
+            results[name] = summarize(latencies, time.perf_counter() - start, errors)
+    return {
+        "meta": {"suite": "handlers", "iterations": iterations, "events": events, "ratings_per_event": ratings},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="活动 API 接口微基准")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--ratings", type=int, default=5)
+    add_gate_arguments(parser)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.iterations, args.events, args.ratings))
+    sys.exit(report(results, args))
@@ -0,0 +1,283 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+from benchmarks.datagen import Dataset, generate
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_ms: List[float], elapsed_s: float, errors: int = 0) -> Dict[str, float]:
+    """延迟分布与吞吐"""
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+        "rps": round(len(values) / elapsed_s, 1) if elapsed_s > 0 else 0.0,
+    }
+
+
+@asynccontextmanager
+async def bench_app(events: int = 1000, ratings_per_event: int = 5, participants_per_event: int = 4):
+    """
+    在临时数据库上启动应用（执行 lifespan）并写入合成数据
+
+    退出时删除临时目录，恢复修改过的环境变量，并把日志恢复为 loguru 默认的 stderr 输出。
+
+    :return: (app, ASGI 客户端, Dataset)
+    """
+    import httpx
+    from loguru import logger
+    from database.lifetime import DATABASE_PATH_ENV, DATABASE_REPLICA_URL_ENV, DATABASE_URL_ENV, SCHEMA_READY_ENV
+    from web.ratelimit import RATELIMIT_DISABLED_ENV
+
+    with tempfile.TemporaryDirectory(prefix="mate_bench_", ignore_cleanup_errors=True) as tmpdir:
+        overrides = {
+            DATABASE_PATH_ENV: os.path.join(tmpdir, "bench.db"),
+            DATABASE_URL_ENV: None,
+            DATABASE_REPLICA_URL_ENV: None,
+            SCHEMA_READY_ENV: None,
+            RATELIMIT_DISABLED_ENV: "1",  # 压测少量用户的高频请求，不应被限流
+        }
+        saved = {name: os.environ.get(name) for name in overrides}
+        _set_env(overrides)
+        logger.remove()
+        handler = logger.add(sys.stderr, level="WARNING")
+        try:
+            from web.testpage import app
+            async with app.router.lifespan_context(app):
+                data = generate(
+                    app.state.engine,
+                    events=events,
+                    ratings_per_event=ratings_per_event,
+                    participants_per_event=participants_per_event,
+                )
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                    yield app, client, data
+        finally:
+            logger.remove(handler)
+            logger.add(sys.stderr)
+            _set_env(saved)
+
+
+def _set_env(values: Dict[str, Optional[str]]) -> None:
+    """设置环境变量，值为 None 时删除"""
+    for name, value in values.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+def measure_startup(runs: int = 3) -> Dict[str, float]:
+    """
+    子进程中测量 worker 冷启动（导入 web.testpage 到 lifespan 就绪）
+
+    :return: startup_ms 的中位数与最大值
+    """
+    script = textwrap.dedent("""
+        import asyncio, os, tempfile
+        os.environ["MATE_DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "startup.db")
+        from web.testpage import app
+
+        async def main():
+            async with app.router.lifespan_context(app):
+                print(app.state.startup_ms)
+
+        asyncio.run(main())
+    """)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(float(out.strip().splitlines()[-1]))
+    samples.sort()
+    return {"startup_ms": round(samples[len(samples) // 2], 1), "startup_max_ms": round(samples[-1], 1)}
+
+
+# ---- 请求场景：每个函数发起一次请求并返回响应 ----
+
+Op = Callable[["httpx.AsyncClient", Dataset, random.Random], Awaitable["httpx.Response"]]
+
+
+def _user(data: Dataset, rng: random.Random) -> str:
+    return rng.choice(data.user_ids)
+
+
+async def op_details(client, data, rng):
+    activity_id = rng.choice(data.activity_ids)
+    return await client.get(f"/api/activities/{activity_id}/details", params={"user_id": _user(data, rng), "token": "t"})
+
+
+async def op_batch_details(client, data, rng, size: int = 50):
+    return await client.post("/api/activities/batch-details", json={
+        "user_id": _user(data, rng), "token": "t", "activity_ids": rng.sample(data.activity_ids, size),
+    })
+
+
+async def op_card(client, data, rng):
+    activity_id = rng.choice(data.activity_ids)
+    return await client.post(
+        f"/api/activities/{activity_id}/generate-card",
+        json={"user_id": _user(data, rng), "token": "t", "activity_id": activity_id},
+    )
+
+
+async def op_feedback_list(client, data, rng):
+    activity_id = rng.choice(data.activity_ids)
+    return await client.get(f"/api/activities/{activity_id}/feedback_list", params={"user_id": _user(data, rng), "token": "t"})
+
+
+async def op_history(client, data, rng):
+    return await client.get("/api/activities/history", params={"user_id": _user(data, rng), "token": "t"})
+
+
+async def op_pending(client, data, rng):
+    return await client.get("/api/admin/activities/pending", params={"user_id": "admin", "token": "t"})
+
+
+async def op_create(client, data, rng):
+    return await client.post("/api/activities/create", json={
+        "user_id": _user(data, rng), "token": "t", "session_id": "bench",
+        "input_data": {"prompt": "周末活动", "theme": "摄影", "location": "香山", "budget": "300元"},
+    })
+
+
+async def op_manual_create(client, data, rng):
+    response = await client.post("/api/activities/manual-create", json={
+        "user_id": _user(data, rng), "token": "t", "title": "压测活动", "description": "压测",
+        "theme": "桌游", "location": "后海", "budget": 100,
+        # 随机开始时间，减少同一用户的日程冲突（409）
+        "start_time": f"2030-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00+08:00",
+        "requirements": {"group_size": 6, "activity_tags": ["压测"]},
+    })
+    if response.status_code == 200:
+        data.activity_ids.append(response.json()["activity_id"])
+    return response
+
+
+async def op_update(client, data, rng):
+    activity_id = rng.choice(data.activity_ids)
+    return await client.put(f"/api/activities/{activity_id}/update", json={
+        "user_id": _user(data, rng), "token": "t", "activity_id": activity_id, "description": "更新后的描述",
+    })
+
+
+async def op_feedback(client, data, rng):
+    # 随机新用户避免触发"重复评价" 400
+    activity_id = rng.choice(data.activity_ids)
+    return await client.post(f"/api/activities/{activity_id}/feedback", json={
+        "user_id": f"rater_{rng.getrandbits(48):012x}", "token": "t", "activity_id": activity_id,
+        "rating": 4.5, "comment": "压测评价",
+    })
+
+
+async def op_moderate(client, data, rng):
+    activity_id = rng.choice(data.pending_ids or data.activity_ids)
+    return await client.post("/api/admin/activities/update", json={
+        "user_id": "admin", "token": "t", "activity_id": activity_id,
+        "status": rng.choice(["approved", "rejected"]), "reviewer_id": "admin", "comment": "",
+    })
+
+
+# 每个接口一个场景，供微基准逐个运行
+HANDLER_OPS: Dict[str, Op] = {
+    "create_activity": op_create,
+    "manual_create_activity": op_manual_create,
+    "generate_activity_card": op_card,
+    "get_activity_detail": op_details,
+    "get_activity_details_batch": op_batch_details,
+    "update_activity": op_update,
+    "submit_activity_feedback": op_feedback,
+    "get_activity_feedback_list": op_feedback_list,
+    "get_user_activity_history": op_history,
+    "get_pending_activities": op_pending,
+    "admin_update_activity": op_moderate,
+}
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(path: str, results: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.25) -> List[str]:
+    """
+    回归门禁：逐场景对比 p95 延迟与吞吐
+
+    :param tolerance: 允许的相对退化比例，0.25 表示 p95 变慢或吞吐下降超过 25% 视为退化
+    :return: 退化描述列表，为空表示通过
+    """
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current.get("results", {}).get(name)
+        if cur is None:
+            regressions.append(f"{name}: 当前结果缺失")
+            continue
+        if base.get("p95_ms") and cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {cur['p95_ms']} ms")
+        if base.get("rps") and cur["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {base['rps']} -> {cur['rps']}")
+        if cur.get("errors", 0) > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    base_startup = baseline.get("startup", {}).get("startup_ms")
+    cur_startup = current.get("startup", {}).get("startup_ms")
+    if base_startup and cur_startup and cur_startup > base_startup * (1 + tolerance):
+        regressions.append(f"startup_ms: {base_startup} -> {cur_startup}")
+    return regressions
+
+
+async def timed(op: Op, client, data: Dataset, rng: random.Random):
+    """执行一次请求，返回 (耗时毫秒, 是否成功)"""
+    start = time.perf_counter()
+    response = await op(client, data, rng)
+    return (time.perf_counter() - start) * 1000, response.status_code < 500
+
+
+def add_gate_arguments(parser) -> None:
+    """--save / --compare / --tolerance 命令行参数"""
+    parser.add_argument("--save", help="将结果保存为基线 JSON")
+    parser.add_argument("--compare", help="与基线 JSON 对比，退化时返回非零退出码")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化比例")
+    parser.add_argument("--skip-startup", action="store_true", help="不测量冷启动")
+
+
+def report(results: dict, args) -> int:
+    """打印结果并执行保存/门禁，返回进程退出码"""
+    if not args.skip_startup:
+        results["startup"] = measure_startup()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.save:
+        save_results(args.save, results)
+    if args.compare:
+        regressions = compare(load_results(args.compare), results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+from benchmarks.harness import (
+    add_gate_arguments, bench_app, report, summarize, timed,
+    op_card, op_details, op_feedback, op_feedback_list, op_history,
+    op_manual_create, op_moderate, op_pending, op_update,
+)
+
+# 混合负载权重：读 70%，创建 10%，评价 10%，审核/更新 10%
+WORKLOAD = [
+    ("details", op_details, 30),
+    ("card", op_card, 15),
+    ("feedback_list", op_feedback_list, 10),
+    ("history", op_history, 10),
+    ("pending", op_pending, 5),
+    ("create", op_manual_create, 10),
+    ("feedback", op_feedback, 10),
+    ("update", op_update, 5),
+    ("moderate", op_moderate, 5),
+]
+
+
+async def run(duration: float, concurrency: int, events: int, ratings: int, seed: int = 7) -> dict:
+    """concurrency 个虚拟用户在 duration 秒内按权重随机发起请求"""
+    names = [name for name, _, _ in WORKLOAD]
+    ops = {name: op for name, op, _ in WORKLOAD}
+    weights = [weight for _, _, weight in WORKLOAD]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async with bench_app(events=events, ratings_per_event=ratings) as (app, client, data):
+        deadline = time.perf_counter() + duration
+
+        async def user(index: int):
+            rng = random.Random(seed + index)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                elapsed_ms, ok = await timed(ops[name], client, data, rng)
+                latencies[name].append(elapsed_ms)
+                if not ok:
+                    errors[name] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = {name: summarize(latencies[name], elapsed, errors[name]) for name in names}
+    results["overall"] = summarize(
+        [value for values in latencies.values() for value in values], elapsed, sum(errors.values())
+    )
+    return {
+        "meta": {
+            "suite": "load", "duration_s": duration, "concurrency": concurrency,
+            "events": events, "ratings_per_event": ratings,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="活动 API 混合负载压测")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--ratings", type=int, default=5)
+    add_gate_arguments(parser)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.duration, args.concurrency, args.events, args.ratings))
+    sys.exit(report(results, args))
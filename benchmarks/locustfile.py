@@ -0,0 +1,93 @@
+"""
+对运行中的服务做混合负载压测（权重与 benchmarks.load 一致）
+
+    python __main__.py --prod --workers 4
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 -u 64 -r 16 -t 60s --headless
+
+locust 不是运行依赖，仅压测时安装。
+"""
+import random
+import uuid
+from locust import HttpUser, between, task
+
+
+class ActivityUser(HttpUser):
+    wait_time = between(0.01, 0.1)
+
+    def on_start(self):
+        self.user_id = f"locust_{uuid.uuid4().hex[:8]}"
+        self.activity_ids = []
+        for _ in range(3):
+            self.create()
+
+    def _activity(self) -> str:
+        return random.choice(self.activity_ids)
+
+    @task(30)
+    def details(self):
+        self.client.get(
+            f"/api/activities/{self._activity()}/details",
+            params={"user_id": self.user_id, "token": "t"},
+            name="/api/activities/[id]/details",
+        )
+
+    @task(15)
+    def card(self):
+        activity_id = self._activity()
+        self.client.post(
+            f"/api/activities/{activity_id}/generate-card",
+            json={"user_id": self.user_id, "token": "t", "activity_id": activity_id},
+            name="/api/activities/[id]/generate-card",
+        )
+
+    @task(10)
+    def feedback_list(self):
+        self.client.get(
+            f"/api/activities/{self._activity()}/feedback_list",
+            params={"user_id": self.user_id, "token": "t"},
+            name="/api/activities/[id]/feedback_list",
+        )
+
+    @task(10)
+    def history(self):
+        self.client.get("/api/activities/history", params={"user_id": self.user_id, "token": "t"})
+
+    @task(5)
+    def pending(self):
+        self.client.get("/api/admin/activities/pending", params={"user_id": "admin", "token": "t"})
+
+    @task(10)
+    def create(self):
+        response = self.client.post("/api/activities/manual-create", json={
+            "user_id": self.user_id, "token": "t", "title": "压测活动", "description": "压测",
+            "theme": "桌游", "location": "后海", "budget": 100, "start_time": "2030-01-01T09:00:00+08:00",
+            "requirements": {"group_size": 6, "activity_tags": ["压测"]},
+        })
+        if response.status_code == 200:
+            self.activity_ids.append(response.json()["activity_id"])
+
+    @task(10)
+    def feedback(self):
+        activity_id = self._activity()
+        self.client.post(
+            f"/api/activities/{activity_id}/feedback",
+            json={"user_id": f"rater_{uuid.uuid4().hex[:12]}", "token": "t", "activity_id": activity_id,
+                  "rating": 4.5, "comment": "压测评价"},
+            name="/api/activities/[id]/feedback",
+        )
+
+    @task(5)
+    def update(self):
+        activity_id = self._activity()
+        self.client.put(
+            f"/api/activities/{activity_id}/update",
+            json={"user_id": self.user_id, "token": "t", "activity_id": activity_id, "status": "pending"},
+            name="/api/activities/[id]/update",
+        )
+
+    @task(5)
+    def moderate(self):
+        self.client.post("/api/admin/activities/update", json={
+            "user_id": "admin", "token": "t", "activity_id": self._activity(),
+            "status": random.choice(["approved", "rejected"]), "reviewer_id": "admin", "comment": "",
+        })
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import Table, delete, insert, literal, select, text
+from sqlalchemy.engine import Connection, Engine
+from schema.database import (
+    Event, EventContent, EventRating, EventReview, AdminActivityAction, EventStatusLog, UserSchedule, ActivityCard,
+    event_archive, event_content_archive, event_rating_archive, event_review_archive,
+    admin_activity_action_archive, event_status_log_archive, activity_member_archive,
+)
+from schema.timeutil import UTCDateTime, utcnow
+
+# 进入终态后不再变化的活动状态
+TERMINAL_STATUSES = ("finished", "cancelled", "rejected")
+
+# 终态保持超过此时长后归档
+RETENTION = timedelta(days=30)
+
+# 随活动一起迁移的子表（热表, 归档表），按外键顺序先子后主
+CHILD_TABLES: List[Tuple[Table, Table]] = [
+    (EventContent.__table__, event_content_archive),
+    (EventRating.__table__, event_rating_archive),
+    (EventReview.__table__, event_review_archive),
+    (AdminActivityAction.__table__, admin_activity_action_archive),
+    (EventStatusLog.__table__, event_status_log_archive),
+]
+
+
+def _archive_chunk(conn: Connection, cutoff: datetime, chunk_size: int, now: datetime) -> int:
+    """迁移一批超过保留期的终态活动，返回迁移的活动数"""
+    event_table = Event.__table__
+    rows = conn.execute(
+        select(event_table.c.activity_id, event_table.c.owner_id, event_table.c.participants_id)
+        .where(event_table.c.status.in_(TERMINAL_STATUSES), event_table.c.updated_at < cutoff)
+        .limit(chunk_size)
+    ).all()
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+
+    conn.execute(insert(event_archive).from_select(
+        [c.name for c in event_table.columns] + ["archived_at"],
+        select(*event_table.columns, literal(now, UTCDateTime())).where(event_table.c.activity_id.in_(ids)),
+    ))
+    for hot, archive in CHILD_TABLES:
+        conn.execute(insert(archive).from_select(
+            [c.name for c in hot.columns],
+            select(*hot.columns).where(hot.c.activity_id.in_(ids)),
+        ))
+    members = [
+        dict(user_id=user_id, activity_id=activity_id)
+        for activity_id, owner_id, participants in rows
+        for user_id in dict.fromkeys([owner_id, *(participants or [])])
+    ]
+    conn.execute(insert(activity_member_archive), members)
+
+    schedule_table = UserSchedule.__table__
+    conn.execute(delete(schedule_table).where(schedule_table.c.activity_id.in_(ids)))
+    # 卡片缓存不归档，归档活动的卡片读取时即时渲染
+    card_table = ActivityCard.__table__
+    conn.execute(delete(card_table).where(card_table.c.activity_id.in_(ids)))
+    for hot, _ in CHILD_TABLES:
+        conn.execute(delete(hot).where(hot.c.activity_id.in_(ids)))
+    conn.execute(delete(event_table).where(event_table.c.activity_id.in_(ids)))
+    return len(ids)
+
+
+def archive_events(
+    engine: Engine,
+    retention: timedelta = RETENTION,
+    chunk_size: int = 500,
+    max_chunks: Optional[int] = None,
+) -> int:
+    """
+    将终态超过保留期的活动连同内容、评价、回顾、审核记录和状态日志迁入归档表
+
+    每批一个短事务，避免长时间持有 SQLite 写锁阻塞在线写入。
+
+    :param retention: 终态保留期（以 updated_at 计）
+    :param chunk_size: 每批活动数
+    :param max_chunks: 最多执行的批数，None 表示直到没有可归档的活动
+    :return: 归档的活动总数
+    """
+    now = utcnow()
+    cutoff = now - retention
+    total, chunks = 0, 0
+    while max_chunks is None or chunks < max_chunks:
+        with engine.begin() as conn:
+            moved = _archive_chunk(conn, cutoff, chunk_size, now)
+        if not moved:
+            break
+        total += moved
+        chunks += 1
+        logger.info(f"Archived {moved} events (total {total})")
+    return total
+
+
+# ---- 读路径回退：热表未命中时查询归档表 ----
+
+def load_archived(conn: Connection, activity_id: str):
+    """
+    读取归档的活动与内容
+
+    :return: (event 行, content 行)，不存在时为 (None, None)；行对象支持按列名取属性
+    """
+    event = conn.execute(select(event_archive).where(event_archive.c.activity_id == activity_id)).first()
+    if event is None:
+        return None, None
+    content = conn.execute(
+        select(event_content_archive).where(event_content_archive.c.activity_id == activity_id)
+    ).first()
+    return event, content
+
+
+def load_archived_many(conn: Connection, activity_ids: List[str]):
+    """
+    批量读取归档的活动与内容（冷路径，两次 IN 查询）
+
+    :return: {activity_id: (event 行, content 行)}，活动或内容缺失的 ID 不在结果中
+    """
+    if not activity_ids:
+        return {}
+    events = {
+        row.activity_id: row
+        for row in conn.execute(select(event_archive).where(event_archive.c.activity_id.in_(activity_ids)))
+    }
+    found = {}
+    for content in conn.execute(
+        select(event_content_archive).where(event_content_archive.c.activity_id.in_(list(events)))
+    ):
+        found.setdefault(content.activity_id, (events[content.activity_id], content))
+    return found
+
+
+def load_archived_ratings(conn: Connection, activity_id: str):
+    return conn.execute(
+        select(event_rating_archive).where(event_rating_archive.c.activity_id == activity_id)
+    ).all()
+
+
+def load_archived_history(conn: Connection, user_id: str, statuses):
+    """用户创建或参与的归档活动"""
+    member_ids = select(activity_member_archive.c.activity_id).where(activity_member_archive.c.user_id == user_id)
+    return conn.execute(
+        select(event_archive).where(
+            event_archive.c.activity_id.in_(member_ids),
+            event_archive.c.status.in_(statuses),
+        )
+    ).all()
+
+
+# 归档任务：python -m database.archive [--retention-days 30] [--chunk-size 500] [--vacuum]
+if __name__ == "__main__":
+    import argparse
+    from fastapi import FastAPI
+    from database.lifetime import init_database
+
+    parser = argparse.ArgumentParser(description="归档终态活动")
+    parser.add_argument("--retention-days", type=float, default=RETENTION.days)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--max-chunks", type=int, default=None)
+    parser.add_argument("--vacuum", action="store_true", help="归档后执行 VACUUM 回收文件空间")
+    args = parser.parse_args()
+
+    app = FastAPI()
+    init_database(app)
+    engine = app.state.engine
+    total = archive_events(engine, timedelta(days=args.retention_days), args.chunk_size, args.max_chunks)
+    logger.success(f"Archived {total} events")
+    if args.vacuum and total:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+        logger.info("VACUUM finished")
+    engine.dispose()
@@ -0,0 +1,266 @@
+import asyncio
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+from sqlalchemy import func, select
+from sqlmodel import Session
+from schema.database import Event, EventContent, EventRating
+from schema.timeutil import utcnow
+
+# 对外展示的活动状态
+PUBLIC_STATUSES = ("approved", "finished")
+
+# 进入好评榜所需的最少评价数
+MIN_RATING_COUNT = 3
+
+# 热度半衰期：24 小时前的一条评价只算半条
+TRENDING_HALF_LIFE_HOURS = 24.0
+# 全量重算时只统计此窗口内的评价，更早的权重可忽略
+TRENDING_WINDOW = timedelta(days=14)
+
+# 每个榜单保留的条数
+TOP_K = 50
+
+KINDS = ("top_rated", "trending")
+SCOPES = ("all", "theme", "location")
+
+_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+BoardKey = Tuple[str, str, Optional[str]]  # (kind, scope, scope_value)
+
+
+def trending_key(timestamps: Iterable[datetime]) -> Optional[float]:
+    """
+    热度排序键：log2(Σ 2^((t_i - epoch) / half_life))
+
+    与"按当前时刻衰减后的加权评价数"排序一致，但不随时间变化，
+    因此不同时刻算出的值可以直接比较，榜单无需定期整体衰减。
+    """
+    exponents = [(t - _EPOCH).total_seconds() / 3600 / TRENDING_HALF_LIFE_HOURS for t in timestamps]
+    if not exponents:
+        return None
+    peak = max(exponents)
+    return peak + math.log2(sum(2 ** (e - peak) for e in exponents))
+
+
+def trending_velocity(key: float, now: datetime = None) -> float:
+    """排序键 -> 当前时刻的衰减加权评价数"""
+    hours = ((now or utcnow()) - _EPOCH).total_seconds() / 3600
+    return 2 ** (key - hours / TRENDING_HALF_LIFE_HOURS)
+
+
+class Leaderboard:
+    """单个榜单：按排序键升序保存的有界列表，更新 O(K)，读取前 n 条 O(n)"""
+
+    def __init__(self, capacity: int = TOP_K):
+        self.capacity = capacity
+        self._entries: List[Tuple[tuple, str]] = []
+        self._keys: Dict[str, tuple] = {}
+
+    def __contains__(self, activity_id: str) -> bool:
+        return activity_id in self._keys
+
+    def discard(self, activity_id: str) -> None:
+        key = self._keys.pop(activity_id, None)
+        if key is not None:
+            index = bisect_left(self._entries, (key, activity_id))
+            del self._entries[index]
+
+    def offer(self, activity_id: str, key: tuple) -> List[str]:
+        """
+        更新活动的排序键
+
+        :return: 因容量被挤出榜单的活动 ID
+        """
+        self.discard(activity_id)
+        entry = (key, activity_id)
+        if len(self._entries) >= self.capacity and entry >= self._entries[-1]:
+            return [activity_id]
+        insort(self._entries, entry)
+        self._keys[activity_id] = key
+        evicted = []
+        while len(self._entries) > self.capacity:
+            _, dropped = self._entries.pop()
+            del self._keys[dropped]
+            evicted.append(dropped)
+        return evicted
+
+    def top(self, limit: int) -> List[str]:
+        return [activity_id for _, activity_id in self._entries[:limit]]
+
+
+class LeaderboardStore:
+    """
+    好评榜 / 热度榜（全站、按主题、按地点）
+
+    评价提交和状态变更时增量更新，后台定期全量重算纠正多 worker 间的漂移。
+    只保存上榜活动的展示信息，内存占用与 榜单数 × K 成正比。
+    """
+
+    def __init__(self, capacity: int = TOP_K, max_boards: int = 2048):
+        self._capacity = capacity
+        self._max_boards = max_boards
+        self._boards: "OrderedDict[BoardKey, Leaderboard]" = OrderedDict()
+        self._items: Dict[str, dict] = {}
+        self._membership: Dict[str, Set[BoardKey]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.rebuilt_at: Optional[datetime] = None
+
+    # ---- 读取 ----
+
+    def top(self, kind: str, scope: str = "all", value: Optional[str] = None, limit: int = 20) -> List[dict]:
+        with self._lock:
+            board = self._boards.get((kind, scope, value))
+            if board is None:
+                return []
+            return [dict(self._items[activity_id]) for activity_id in board.top(limit)]
+
+    # ---- 增量更新 ----
+
+    def update(self, event, content, ratings: List[EventRating]) -> None:
+        """
+        按活动的最新状态、内容和全部评价刷新其在各榜单中的位置
+
+        :param event: Event
+        :param content: EventContent（可为 None，视为不可上榜）
+        :param ratings: 该活动的全部评价
+        """
+        with self._lock:
+            self._discard(event.activity_id)
+            if content is None or event.status not in PUBLIC_STATUSES:
+                return
+            values = [r.rating for r in ratings if r.rating is not None]
+            since = utcnow() - TRENDING_WINDOW
+            timestamps = [r.submitted_at for r in ratings if r.submitted_at is not None and r.submitted_at >= since]
+            self._place(
+                event.activity_id, content.title, content.theme, content.location,
+                sum(values) / len(values) if values else None, len(values), trending_key(timestamps)
+            )
+
+    def remove(self, activity_id: str) -> None:
+        with self._lock:
+            self._discard(activity_id)
+
+    def _discard(self, activity_id: str) -> None:
+        for board_key in self._membership.pop(activity_id, ()):
+            board = self._boards.get(board_key)
+            if board is not None:
+                board.discard(activity_id)
+        self._items.pop(activity_id, None)
+
+    def _forget(self, activity_id: str, board_key: BoardKey) -> None:
+        """活动离开某个榜单；不再在任何榜单上时释放其展示信息"""
+        members = self._membership.get(activity_id)
+        if members is None:
+            return
+        members.discard(board_key)
+        if not members:
+            del self._membership[activity_id]
+            self._items.pop(activity_id, None)
+
+    def _board(self, board_key: BoardKey) -> Leaderboard:
+        board = self._boards.get(board_key)
+        if board is None:
+            board = self._boards[board_key] = Leaderboard(self._capacity)
+            while len(self._boards) > self._max_boards:
+                dropped_key, dropped = self._boards.popitem(last=False)
+                for activity_id in dropped.top(dropped.capacity):
+                    self._forget(activity_id, dropped_key)
+        self._boards.move_to_end(board_key)
+        return board
+
+    def _place(self, activity_id, title, theme, location, rating, rating_count, trend) -> None:
+        keys: List[Tuple[BoardKey, tuple]] = []
+        scopes = [("all", None), ("theme", theme), ("location", location)]
+        if rating is not None and rating_count >= MIN_RATING_COUNT:
+            keys += [(("top_rated", scope, value), (-rating, -rating_count)) for scope, value in scopes]
+        if trend is not None:
+            keys += [(("trending", scope, value), (-trend,)) for scope, value in scopes]
+
+        for board_key, sort_key in keys:
+            board = self._board(board_key)
+            evicted = board.offer(activity_id, sort_key)
+            if activity_id not in evicted:
+                self._membership[activity_id].add(board_key)
+            for dropped in evicted:
+                if dropped != activity_id:
+                    self._forget(dropped, board_key)
+
+        if self._membership.get(activity_id):
+            self._items[activity_id] = dict(
+                activity_id=activity_id, title=title, theme=theme, location=location,
+                rating=rating, rating_count=rating_count, trending_key=trend,
+            )
+        else:
+            self._membership.pop(activity_id, None)
+
+    # ---- 全量重算 ----
+
+    def rebuild(self, session: Session) -> int:
+        """
+        从数据库全量重算所有榜单，构建完成后整体替换
+
+        :return: 参与排名的活动数
+        """
+        event_table, content_table, rating_table = Event.__table__, EventContent.__table__, EventRating.__table__
+        stats = dict(
+            (activity_id, (avg, count))
+            for activity_id, avg, count in session.execute(
+                select(rating_table.c.activity_id, func.avg(rating_table.c.rating), func.count())
+                .group_by(rating_table.c.activity_id)
+            )
+        )
+        recent: Dict[str, List[datetime]] = defaultdict(list)
+        for activity_id, submitted_at in session.execute(
+            select(rating_table.c.activity_id, rating_table.c.submitted_at)
+            .where(rating_table.c.submitted_at >= utcnow() - TRENDING_WINDOW)
+        ):
+            recent[activity_id].append(submitted_at)
+        rows = session.execute(
+            select(event_table.c.activity_id, content_table.c.title, content_table.c.theme, content_table.c.location)
+            .join(content_table, content_table.c.activity_id == event_table.c.activity_id)
+            .where(event_table.c.status.in_(PUBLIC_STATUSES))
+        ).all()
+
+        fresh = LeaderboardStore(self._capacity, self._max_boards)
+        for activity_id, title, theme, location in rows:
+            avg, count = stats.get(activity_id, (None, 0))
+            fresh._place(activity_id, title, theme, location, avg, count, trending_key(recent.get(activity_id, ())))
+        with self._lock:
+            self._boards, self._items, self._membership = fresh._boards, fresh._items, fresh._membership
+            self.rebuilt_at = utcnow()
+        return len(rows)
+
+
+leaderboards = LeaderboardStore()
+
+
+def refresh_activity(session: Session, activity_id: str) -> None:
+    """状态变更后按数据库中的最新数据刷新单个活动的榜单位置"""
+    event = session.get(Event, activity_id)
+    if event is None:
+        leaderboards.remove(activity_id)
+        return
+    content = session.query(EventContent).filter_by(activity_id=activity_id).first()
+    ratings = session.query(EventRating).filter_by(activity_id=activity_id).all()
+    leaderboards.update(event, content, ratings)
+
+
+async def run_periodic_rebuild(engine, interval: float = 300.0) -> None:
+    """后台任务：启动后立即重算一次，之后每 interval 秒重算一次"""
+    from starlette.concurrency import run_in_threadpool
+
+    def rebuild():
+        with Session(engine) as session:
+            return leaderboards.rebuild(session)
+
+    while True:
+        try:
+            count = await run_in_threadpool(rebuild)
+            logger.info(f"Leaderboards rebuilt from {count} public activities")
+        except Exception as e:
+            logger.error(f"Leaderboard rebuild failed: {e}")
+        await asyncio.sleep(interval)
@@ -1,56 +1,116 @@
 from fastapi import FastAPI
 from loguru import logger
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlmodel import Field, Session, SQLModel, create_engine
 from typing import List, Optional, Dict
 from datetime import datetime
 from sqlalchemy import Column, JSON, DateTime, Float, Integer, String, select
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+import math
+import os
+import sqlite3
 import sys
+import time
+from collections import OrderedDict
 from pathlib import Path
 from schema.database import Event, EventContent, EventRating, PartnerRating, EventReview
+from database.migrations import ensure_schema
 
-# 数据库生命周期管理
-def init_database(app: FastAPI) -> None:
-    """初始化数据库连接池并创建表结构"""
-    # 获取并标准化路径
-    database_path = r"C:\Machine Files\event_management.db"
-    db_path = Path(database_path).absolute()
-    database_path = str(db_path)
-    db_dir = db_path.parent
-    
-    # 1. 验证目录
-    try:
-        db_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Database directory: {db_dir}")
-        
-        # 测试目录可写性
-        test_file = db_dir / "db_permission_test.tmp"
-        test_file.touch()
-        test_file.unlink()
-    except Exception as e:
-        logger.critical(f"Directory error: {e}")
-        logger.critical(f"请手动创建目录并设置权限: {db_dir}")
-        sys.exit(1)
-    
-    # 2. 创建数据库引擎
+# 多 worker 启动时由主进程设置：表结构已创建，worker 只需建立连接
+SCHEMA_READY_ENV = "MATE_SCHEMA_READY"
+
+
+# 数据库文件路径，可通过环境变量覆盖（压测/多环境部署）
+DATABASE_PATH_ENV = "MATE_DATABASE_PATH"
+
+# 设置后改用服务端数据库（如 postgresql+psycopg://...），忽略 MATE_DATABASE_PATH
+DATABASE_URL_ENV = "MATE_DATABASE_URL"
+# 只读副本地址；未设置时读写共用主库
+DATABASE_REPLICA_URL_ENV = "MATE_DATABASE_REPLICA_URL"
+
+# SQLite 只读连接池大小
+READ_POOL_SIZE = 8
+
+# 读己之写：用户提交写入后此时长内的读请求走主库，避开副本延迟
+STICKY_SECONDS = 10.0
+# 记录客户端最近一次写入时间（Unix 秒）的 cookie，请求落到其他 worker 时仍能读己之写
+LAST_WRITE_COOKIE = "mate_last_write"
+
+
+def _database_path() -> Path:
+    """获取并标准化数据库文件路径"""
+    database_path = os.environ.get(DATABASE_PATH_ENV, r"C:\Machine Files\event_management.db")
+    return Path(database_path).absolute()
+
+
+def _create_engine(db_path: Path) -> Engine:
+    """
+    创建 SQLite 写连接池，开启 WAL 以便多个 worker 进程并发读写
+
+    SQLite 同一时刻只有一个写事务，写入已由库文件锁串行化；连接池不再缩小到单连接，
+    否则异步处理函数在事件循环上等待连接时会阻塞持有连接的其他请求。
+    """
     sqlite_url = f"sqlite:///{db_path}"
-    
-    # Windows 需要额外的连接参数
-    connect_args = {}
-    if sys.platform.startswith("win"):
-        connect_args["check_same_thread"] = False
-    
+
+    # 连接池中的连接会在线程池（详情/卡片读路径）中跨线程复用
+    # timeout: 其他进程持有写锁时等待而不是立即报 database is locked
+    connect_args = {"check_same_thread": False, "timeout": 30}
+
     engine = create_engine(
         sqlite_url,
         echo=False,
         connect_args=connect_args
     )
-    
-    # 3. 尝试创建数据库
+
+    @sa_event.listens_for(engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+def _create_read_engine(db_path: Path) -> Engine:
+    """
+    创建 SQLite 只读连接池（mode=ro）
+
+    WAL 模式下读连接不阻塞写入，也不会被写入阻塞；只读打开保证读路径不会意外写库。
+    """
+    uri = f"{db_path.as_uri()}?mode=ro"
+
+    def connect():
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30)
+
+    return create_engine(
+        "sqlite://",
+        creator=connect,
+        poolclass=QueuePool,
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE,
+        echo=False
+    )
+
+
+def _create_server_engines(url: str, replica_url: Optional[str]):
+    """服务端数据库：主库负责写入，有副本时读请求走副本"""
+    writer = create_engine(url, pool_pre_ping=True, echo=False)
+    reader = create_engine(replica_url, pool_pre_ping=True, echo=False) if replica_url else writer
+    return writer, reader
+
+
+def _create_schema(engine: Engine, db_path: Path) -> None:
+    """按存储的表结构版本建表/迁移；并发启动时其他进程已完成视为成功"""
     try:
-        SQLModel.metadata.create_all(engine)
-        logger.success(f"Database initialized at {db_path}")
-    except OperationalError as e:
+        if ensure_schema(engine):
+            logger.success(f"Database initialized at {db_path}")
+    except (OperationalError, IntegrityError) as e:
+        if isinstance(e, IntegrityError) or "already exists" in str(e):
+            logger.info("表结构已由其他进程创建")
+            return
         logger.critical(f"无法打开数据库文件: {db_path}")
         logger.critical(f"错误详情: {e}")
         
@@ -58,15 +118,81 @@ def init_database(app: FastAPI) -> None:
         try:
             logger.warning("尝试创建空数据库文件...")
             db_path.touch()
-            SQLModel.metadata.create_all(engine)
+            ensure_schema(engine)
             logger.warning("已创建新的空数据库文件")
         except Exception as e2:
             logger.critical(f"创建数据库文件失败: {e2}")
             logger.critical("请检查磁盘空间和文件权限")
             sys.exit(1)
-    
+
+
+def _prepare_directory(db_path: Path) -> None:
+    """数据库文件不存在时创建所在目录；权限问题在首次连接时暴露"""
+    if db_path.exists():
+        return
+    db_dir = db_path.parent
+    try:
+        db_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Database directory: {db_dir}")
+    except Exception as e:
+        logger.critical(f"Directory error: {e}")
+        logger.critical(f"请手动创建目录并设置权限: {db_dir}")
+        sys.exit(1)
+
+
+def bootstrap_database() -> None:
+    """
+    在启动 worker 之前由主进程执行一次建表/迁移
+
+    完成后设置环境变量，fork/spawn 出的 worker 在 init_database 中跳过建表，
+    避免多个 worker 同时执行 create_all。
+    """
+    db_path = _database_path()
+    _prepare_directory(db_path)
+    engine = _create_engine(db_path)
+    try:
+        _create_schema(engine, db_path)
+    finally:
+        engine.dispose()
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+
+# 数据库生命周期管理
+def init_database(app: FastAPI) -> None:
+    """
+    初始化读写连接池并创建表结构
+
+    app.state.engine 为写连接池（主库），app.state.read_engine 为读连接池。
+    """
+    url = os.environ.get(DATABASE_URL_ENV)
+    if url:
+        engine, read_engine = _create_server_engines(url, os.environ.get(DATABASE_REPLICA_URL_ENV))
+        if os.environ.get(SCHEMA_READY_ENV) != "1":
+            ensure_schema(engine)
+        # 副本存在复制延迟，写入者短时间内的读请求需要回到主库
+        app.state.sticky_reads = read_engine is not engine
+    else:
+        db_path = _database_path()
+        if os.environ.get(SCHEMA_READY_ENV) == "1":
+            # 主进程已建表，worker 只创建连接池
+            engine = _create_engine(db_path)
+        else:
+            # 1. 验证目录
+            _prepare_directory(db_path)
+            # 2. 创建数据库引擎
+            engine = _create_engine(db_path)
+            # 3. 尝试创建数据库
+            _create_schema(engine, db_path)
+        # 只读连接依赖写连接已建立的 WAL 共享内存文件
+        with engine.connect():
+            pass
+        read_engine = _create_read_engine(db_path)
+        # 读写共用同一文件，提交即可见，无需粘滞
+        app.state.sticky_reads = False
+
     # 存储引擎引用
     app.state.engine = engine
+    app.state.read_engine = read_engine
 
 async def shutdown_database(app: FastAPI) -> None:
     """
@@ -74,30 +200,156 @@ async def shutdown_database(app: FastAPI) -> None:
     
     :param app: FastAPI应用实例
     """
-    engine = app.state.engine
-    
+    engine = getattr(app.state, "engine", None)
+    read_engine = getattr(app.state, "read_engine", None)
+
     # 显式关闭连接池
+    if read_engine and read_engine is not engine:
+        read_engine.dispose()
     if engine:
         engine.dispose()
         logger.info("Database connection pool closed")
-    
+
     # 清理应用状态
     app.state.engine = None
+    app.state.read_engine = None
 
 from fastapi import Request
 
-def get_session(request: Request) -> Session:
+class RecentWriters:
+    """
+    最近提交过写入的用户（进程内 LRU）
+
+    只记录窗口内的用户，超过 max_users 时淘汰最早的记录。
+    记录只在本进程可见：多 worker 部署时同一用户的下一个请求可能落到其他 worker，
+    因此写入后还会通过 LAST_WRITE_COOKIE 把写入时间交给客户端携带（见 read_engine）；
+    不保存 cookie 的客户端只能在同一 worker 内读己之写。
+    """
+
+    def __init__(self, window: float = STICKY_SECONDS, max_users: int = 10_000):
+        self._window = window
+        self._max_users = max_users
+        self._written: "OrderedDict[str, float]" = OrderedDict()
+
+    def mark(self, user_id: str) -> None:
+        self._written[user_id] = time.monotonic()
+        self._written.move_to_end(user_id)
+        while len(self._written) > self._max_users:
+            self._written.popitem(last=False)
+
+    def __contains__(self, user_id: str) -> bool:
+        written_at = self._written.get(user_id)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > self._window:
+            del self._written[user_id]
+            return False
+        return True
+
+
+recent_writers = RecentWriters()
+
+
+def _track(request: Request, session: Session) -> Session:
+    # 请求结束时由 DatabaseSessionMiddleware 统一关闭，连接及时归还连接池
+    sessions = request.scope.get(REQUEST_SESSIONS_KEY)
+    if sessions is not None:
+        sessions.append(session)
+    return session
+
+
+def get_session(request: Request, user_id: str = None) -> Session:
     """
-    获取数据库会话（用于依赖注入）
+    获取主库（写）会话（用于依赖注入）
     
     :param request: FastAPI请求对象
+    :param user_id: 写入者；提交成功后其读请求在 STICKY_SECONDS 内走主库
     :return: SQLModel会话实例
     """
     engine = request.app.state.engine
     if not engine:
         raise RuntimeError("Database engine not initialized")
     
-    return Session(engine)
+    session = Session(engine)
+    if request.app.state.sticky_reads:
+        sa_event.listen(session, "after_commit", lambda _: _mark_write(request, user_id))
+    return _track(request, session)
+
+
+def _mark_write(request: Request, user_id: Optional[str]) -> None:
+    if user_id:
+        recent_writers.mark(user_id)
+    # 由 DatabaseSessionMiddleware 写入响应的 Set-Cookie
+    request.scope[LAST_WRITE_KEY] = time.time()
+
+
+def _wrote_recently(request: Request) -> bool:
+    """客户端携带的最近写入时间是否仍在粘滞窗口内（cookie 可被伪造，最多让读请求多走主库）"""
+    value = request.cookies.get(LAST_WRITE_COOKIE)
+    if not value:
+        return False
+    try:
+        return time.time() - float(value) < STICKY_SECONDS
+    except ValueError:
+        return False
+
+
+def read_engine(request: Request, user_id: str = None) -> Engine:
+    """读请求使用的连接池：请求者刚写入过时返回主库，否则返回读连接池"""
+    state = request.app.state
+    if state.sticky_reads and ((user_id and user_id in recent_writers) or _wrote_recently(request)):
+        return state.engine
+    return state.read_engine
+
+
+def get_read_session(request: Request, user_id: str = None) -> Session:
+    """
+    获取只读会话（GET 等只读接口）
+
+    :param user_id: 请求者，用于读己之写
+    """
+    engine = read_engine(request, user_id)
+    if not engine:
+        raise RuntimeError("Database engine not initialized")
+    return _track(request, Session(engine))
+
+
+REQUEST_SESSIONS_KEY = "db_sessions"
+LAST_WRITE_KEY = "db_last_write"
+
+
+class DatabaseSessionMiddleware:
+    """
+    关闭请求期间通过 get_session 创建的会话
+
+    只读请求不会提交事务，会话若不关闭会一直占用连接，直到被垃圾回收。
+    请求内提交过写入（且开启了粘滞读）时，在响应中设置 LAST_WRITE_COOKIE。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sessions = []
+        scope[REQUEST_SESSIONS_KEY] = sessions
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and LAST_WRITE_KEY in scope:
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={scope[LAST_WRITE_KEY]:.3f}; "
+                    f"Max-Age={math.ceil(STICKY_SECONDS)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = dict(message, headers=[*message.get("headers", ()), (b"set-cookie", cookie.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            for session in sessions:
+                session.close()
 
 # 在 __main__ 部分添加测试代码
 if __name__ == "__main__":
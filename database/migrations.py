@@ -0,0 +1,205 @@
+from typing import Callable, Dict
+from datetime import datetime, timedelta, timezone
+from loguru import logger
+from sqlalchemy import func, inspect, select, insert, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlmodel import SQLModel
+from schema.database import SchemaVersion, AdminActivityAction, Event, EventContent, EventRating
+from schema.timeutil import utcnow
+
+# 当前代码期望的表结构版本；新增表/列或需要数据迁移时加一并注册迁移函数
+SCHEMA_VERSION = 10
+
+# 版本号 -> 迁移函数（在 create_all 之后、同一事务内执行）
+# 只新增表的版本（如 5：归档表；8：卡片缓存表）无需迁移函数，create_all 即可完成
+MIGRATIONS: Dict[int, Callable[[Connection], None]] = {}
+
+
+def migration(version: int):
+    """注册升级到 version 的迁移函数"""
+    def decorator(func: Callable[[Connection], None]):
+        MIGRATIONS[version] = func
+        return func
+    return decorator
+
+
+def stored_version(conn: Connection) -> int:
+    """
+    读取数据库中记录的表结构版本
+
+    :return: 版本号；版本表不存在（新库或旧库）时返回 0
+    """
+    table = SchemaVersion.__table__
+    try:
+        row = conn.execute(select(table.c.version).where(table.c.id == 1)).first()
+    except (OperationalError, ProgrammingError):
+        conn.rollback()
+        return 0
+    return row[0] if row else 0
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """
+    版本落后时执行建表与迁移，版本一致时不执行任何 DDL
+
+    :param engine: 数据库引擎
+    :return: 是否执行了 DDL/迁移
+    """
+    with engine.connect() as conn:
+        current = stored_version(conn)
+    if current >= SCHEMA_VERSION:
+        logger.info(f"Schema version {current} is current, skip DDL")
+        return False
+
+    SQLModel.metadata.create_all(engine)
+    table = SchemaVersion.__table__
+    now = utcnow()
+    with engine.begin() as conn:
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            if version in MIGRATIONS:
+                logger.info(f"Applying schema migration {version}")
+                MIGRATIONS[version](conn)
+        if current == 0:
+            conn.execute(insert(table).values(id=1, version=SCHEMA_VERSION, applied_at=now))
+        else:
+            conn.execute(
+                update(table).where(table.c.id == 1).values(version=SCHEMA_VERSION, applied_at=now)
+            )
+    logger.success(f"Schema upgraded from version {current} to {SCHEMA_VERSION}")
+    return True
+
+
+def _local_to_utc(value: datetime) -> datetime:
+    """按服务器本地时区解释墙上时间并转换为 UTC"""
+    return value.replace(tzinfo=None).astimezone(timezone.utc)
+
+
+def _beijing_to_utc(value: datetime) -> datetime:
+    """按东八区解释墙上时间并转换为 UTC"""
+    return value.replace(tzinfo=timezone(timedelta(hours=8))).astimezone(timezone.utc)
+
+
+@migration(2)
+def normalize_timestamps_to_utc(conn: Connection) -> None:
+    """
+    旧数据时间统一为 UTC，并为 event_content.start_time 建索引
+
+    旧代码写入的时间是不带时区的墙上时间（SQLite 不保存时区）：
+    - /create 生成的活动（ID 为 "a" + 6 位 hex）按东八区写入 created_at/updated_at/start_time
+    - /manual-create、/update、/feedback 使用服务器本地时间 datetime.now()
+    - 管理员审核使用 datetime.utcnow()，已是 UTC，不处理
+    手动创建的 start_time 来自客户端，无法得知原偏移，按 UTC 保留。
+    updated_at 与 created_at 相同时按 created_at 的规则处理；
+    与该活动最近一次审核的 operated_at 相同时是审核写入的 UTC，保留；其余视为本地时间。
+    """
+    event_table = Event.__table__
+    content_table = EventContent.__table__
+    rating_table = EventRating.__table__
+    action_table = AdminActivityAction.__table__
+
+    # 审核接口以同一个 utcnow() 写入 updated_at 与 operated_at
+    reviewed_at = dict(conn.execute(
+        select(action_table.c.activity_id, func.max(action_table.c.operated_at)).group_by(action_table.c.activity_id)
+    ).all())
+
+    generated_ids = set()
+    rows = conn.execute(
+        select(event_table.c.activity_id, event_table.c.created_at, event_table.c.updated_at)
+    ).all()
+    for activity_id, created_at, updated_at in rows:
+        generated = len(activity_id) == 7 and activity_id.startswith("a")
+        convert = _beijing_to_utc if generated else _local_to_utc
+        if generated:
+            generated_ids.add(activity_id)
+        values = {}
+        if created_at is not None:
+            values["created_at"] = convert(created_at)
+        if updated_at is not None:
+            if updated_at == created_at:
+                values["updated_at"] = convert(updated_at)
+            elif updated_at != reviewed_at.get(activity_id):
+                values["updated_at"] = _local_to_utc(updated_at)
+        if values:
+            conn.execute(
+                update(event_table).where(event_table.c.activity_id == activity_id).values(**values)
+            )
+
+    rows = conn.execute(
+        select(content_table.c.id, content_table.c.activity_id, content_table.c.start_time)
+    ).all()
+    for row_id, activity_id, start_time in rows:
+        if start_time is not None and activity_id in generated_ids:
+            conn.execute(
+                update(content_table).where(content_table.c.id == row_id).values(start_time=_beijing_to_utc(start_time))
+            )
+
+    rows = conn.execute(select(rating_table.c.rating_id, rating_table.c.submitted_at)).all()
+    for rating_id, submitted_at in rows:
+        if submitted_at is not None:
+            conn.execute(
+                update(rating_table).where(rating_table.c.rating_id == rating_id).values(submitted_at=_local_to_utc(submitted_at))
+            )
+
+    for index in content_table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+@migration(3)
+def build_user_reputation(conn: Connection) -> None:
+    """新建 user_reputation 表后，用已有的伙伴评价初始化聚合"""
+    from database.reputation import rebuild_reputation
+    rebuild_reputation(conn)
+
+
+@migration(4)
+def build_user_schedule(conn: Connection) -> None:
+    """新建 user_schedule 表后，由现有活动生成成员日程"""
+    from database.schedule import rebuild_schedule
+    rebuild_schedule(conn)
+
+
+@migration(6)
+def index_event_content_activity_id(conn: Connection) -> None:
+    """详情与批量详情按 activity_id 查询 event_content，补建索引"""
+    for index in EventContent.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+@migration(7)
+def add_event_version(conn: Connection) -> None:
+    """event / event_archive 增加 version 列；旧审核接口写入的 approve/reject 统一为状态名"""
+    from database.status import DECISION_ALIASES
+    from schema.database import event_archive
+    inspector = inspect(conn)
+    for table in (Event.__table__, event_archive):
+        if "version" not in {c["name"] for c in inspector.get_columns(table.name)}:
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+        for alias, status in DECISION_ALIASES.items():
+            conn.execute(update(table).where(table.c.status == alias).values(status=status))
+
+
+@migration(9)
+def rekey_child_archive_tables(conn: Connection) -> None:
+    """子表的归档表改用自己的 archive_id 主键：重命名旧表、按新结构建表后复制数据"""
+    from database.archive import CHILD_TABLES
+    inspector = inspect(conn)
+    for hot, archive in CHILD_TABLES:
+        if "archive_id" in {c["name"] for c in inspector.get_columns(archive.name)}:
+            continue
+        # 索引名全库唯一，先删除旧表上的同名索引
+        for index in archive.indexes:
+            index.drop(conn, checkfirst=True)
+        old = f"{archive.name}_old"
+        conn.execute(text(f"ALTER TABLE {archive.name} RENAME TO {old}"))
+        archive.create(conn)
+        columns = ", ".join(c.name for c in hot.columns)
+        conn.execute(text(f"INSERT INTO {archive.name} ({columns}) SELECT {columns} FROM {old}"))
+        conn.execute(text(f"DROP TABLE {old}"))
+
+
+@migration(10)
+def drop_placeholder_schedule(conn: Connection) -> None:
+    """生成活动的占位时间不再占用日程，重建 user_schedule 去掉已写入的占位行"""
+    from database.schedule import rebuild_schedule
+    rebuild_schedule(conn)
@@ -0,0 +1,161 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+from loguru import logger
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
+from schema.database import PartnerRating, UserReputation
+from schema.timeutil import utcnow
+
+# 评价权重半衰期：90 天前的一条评价只算半条
+HALF_LIFE_DAYS = 90.0
+_HALF_LIFE_SECONDS = HALF_LIFE_DAYS * 86400
+
+# 不计入信誉的评价状态
+EXCLUDED_STATUSES = ("rejected",)
+
+
+def decay(score: float, since: datetime, until: datetime) -> float:
+    """将 since 时刻的加权分衰减到 until 时刻"""
+    seconds = (until - since).total_seconds()
+    if seconds <= 0:
+        return score
+    return score * 0.5 ** (seconds / _HALF_LIFE_SECONDS)
+
+
+def current_score(reputation: UserReputation, now: datetime = None) -> float:
+    """读取时把存储的分数衰减到当前时刻，O(1)"""
+    if reputation.last_rated_at is None:
+        return 0.0
+    return decay(reputation.score, reputation.last_rated_at, now or utcnow())
+
+
+def _lock_reputation(session: Session, user_id: str) -> UserReputation:
+    """
+    锁定（必要时先创建）用户的聚合行，使并发评价的读-改-写串行执行
+
+    先执行一条写语句：SQLite 从此持有库级写锁直到提交，其他写入者等待后读到的是提交后的值；
+    服务端数据库再以 SELECT ... FOR UPDATE 锁定该行。
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    session.execute(
+        upsert(UserReputation.__table__)
+        .values(user_id=user_id, rating_count=0, tag_histogram={}, score=0.0, updated_at=utcnow())
+        .on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    return (
+        session.query(UserReputation)
+        .filter_by(user_id=user_id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+
+
+def apply_partner_rating(session: Session, rating: PartnerRating) -> UserReputation:
+    """
+    新评价到达时增量更新被评价用户的聚合（与评价写入在同一事务，由调用方提交）
+
+    :param session: 数据库会话
+    :param rating: 新写入的伙伴评价
+    :return: 更新后的聚合行
+    """
+    reputation = _lock_reputation(session, rating.user_id)
+    if rating.status in EXCLUDED_STATUSES:
+        return reputation
+
+    histogram = dict(reputation.tag_histogram or {})
+    for tag in rating.tags or []:
+        histogram[tag] = histogram.get(tag, 0) + 1
+    reputation.tag_histogram = histogram  # JSON 列需整体赋值才会被标记为已修改
+    reputation.rating_count += 1
+
+    submitted_at = rating.submitted_at
+    if reputation.last_rated_at is None or submitted_at >= reputation.last_rated_at:
+        reputation.score = decay(reputation.score, reputation.last_rated_at or submitted_at, submitted_at) + 1.0
+        reputation.last_rated_at = submitted_at
+    else:
+        # 迟到的旧评价：按其时间衰减后计入
+        reputation.score += decay(1.0, submitted_at, reputation.last_rated_at)
+    reputation.updated_at = utcnow()
+    return reputation
+
+
+def get_reputations(session: Session, user_ids: Iterable[str]) -> Dict[str, UserReputation]:
+    """一次 IN 查询读取多个用户的聚合"""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    rows = session.query(UserReputation).filter(UserReputation.user_id.in_(user_ids)).all()
+    return {row.user_id: row for row in rows}
+
+
+def rebuild_reputation(conn: Connection, batch_size: int = 5000) -> int:
+    """
+    全量重算所有用户的聚合，用于初始化和纠正增量漂移
+
+    按 user_id 顺序流式扫描一遍评价表，逐批计算计数、标签直方图和衰减分，
+    最后在同一事务内整表替换。
+
+    :param conn: 数据库连接（调用方负责事务）
+    :param batch_size: 每次从游标取回的行数
+    :return: 重算的用户数
+    """
+    table = PartnerRating.__table__
+    now = utcnow()
+    counts: Dict[str, int] = defaultdict(int)
+    histograms: Dict[str, Counter] = defaultdict(Counter)
+    scores: Dict[str, float] = defaultdict(float)
+    last_rated: Dict[str, datetime] = {}
+
+    result = conn.execute(
+        select(table.c.user_id, table.c.submitted_at, table.c.tags)
+        .where(table.c.status.not_in(EXCLUDED_STATUSES))
+        .order_by(table.c.user_id)
+    )
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        for user_id, submitted_at, tags in rows:
+            submitted_at = submitted_at or now
+            counts[user_id] += 1
+            histograms[user_id].update(tags or [])
+            # 先统一衰减到 now，写入前再换算到各自的 last_rated_at
+            scores[user_id] += decay(1.0, submitted_at, now)
+            if user_id not in last_rated or submitted_at > last_rated[user_id]:
+                last_rated[user_id] = submitted_at
+
+    records: List[dict] = [
+        dict(
+            user_id=user_id,
+            rating_count=count,
+            tag_histogram=dict(histograms[user_id]),
+            score=scores[user_id] * 2 ** ((now - last_rated[user_id]).total_seconds() / _HALF_LIFE_SECONDS),
+            last_rated_at=last_rated[user_id],
+            updated_at=now,
+        )
+        for user_id, count in counts.items()
+    ]
+    reputation_table = UserReputation.__table__
+    conn.execute(delete(reputation_table))
+    for start in range(0, len(records), batch_size):
+        conn.execute(insert(reputation_table), records[start:start + batch_size])
+    logger.info(f"Rebuilt reputation for {len(records)} users")
+    return len(records)
+
+
+# 全量重算任务：python -m database.reputation
+if __name__ == "__main__":
+    from fastapi import FastAPI
+    from database.lifetime import init_database
+
+    app = FastAPI()
+    init_database(app)
+    with app.state.engine.begin() as conn:
+        rebuild_reputation(conn)
+    app.state.engine.dispose()
@@ -0,0 +1,370 @@
+import threading
+import time
+from bisect import insort
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlmodel import Session
+from schema.database import UserSchedule
+
+# EventContent.duration 为空时按此时长（小时）占用日程
+DEFAULT_DURATION_HOURS = 2.0
+
+# 这些状态的活动不占用日程
+INACTIVE_STATUSES = ("cancelled", "rejected")
+
+# /create 生成的活动没有真实开始时间，以创建当天东八区上午 9 点占位
+_PLACEHOLDER_TZ = timezone(timedelta(hours=8))
+PLACEHOLDER_HOUR = 9
+
+Interval = Tuple[float, float, str]  # (开始时间戳, 结束时间戳, activity_id)
+
+
+def activity_interval(start_time: datetime, duration: Optional[float]) -> Tuple[datetime, datetime]:
+    """由开始时间和时长（小时）得到占用区间 [start, end)"""
+    hours = duration if duration else DEFAULT_DURATION_HOURS
+    return start_time, start_time + timedelta(hours=hours)
+
+
+def placeholder_start(created_at: datetime) -> datetime:
+    """/create 生成活动的占位开始时间（UTC）"""
+    return created_at.astimezone(_PLACEHOLDER_TZ).replace(
+        hour=PLACEHOLDER_HOUR, minute=0, second=0, microsecond=0
+    ).astimezone(timezone.utc)
+
+
+def is_placeholder(activity_id: str, created_at: datetime, start_time: datetime, duration: Optional[float]) -> bool:
+    """生成的活动（ID 为 "a" + 6 位 hex）尚未设置过时间：占位时间不占用日程"""
+    return (
+        len(activity_id) == 7 and activity_id.startswith("a") and duration is None
+        and created_at is not None and start_time == placeholder_start(created_at)
+    )
+
+
+def _ts(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _dt(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class IntervalIndex:
+    """
+    单个用户的区间树
+
+    区间按开始时间排序存放在数组中，数组本身视为隐式平衡二叉树（区间 [lo, hi) 的根是中点），
+    每个节点记录子树内最大结束时间。重叠查询 O(log n + k)；写入后标记失效，下次查询时 O(n) 重建。
+    """
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self._items: List[Interval] = sorted(intervals)
+        self._max_end: List[float] = []
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, start: float, end: float, key: str) -> None:
+        insort(self._items, (start, end, key))
+        self._dirty = True
+
+    def remove(self, key: str) -> None:
+        self._items = [item for item in self._items if item[2] != key]
+        self._dirty = True
+
+    def _build(self) -> None:
+        items = self._items
+        max_end = [0.0] * len(items)
+
+        def build(lo: int, hi: int) -> float:
+            if lo >= hi:
+                return float("-inf")
+            mid = (lo + hi) // 2
+            value = max(items[mid][1], build(lo, mid), build(mid + 1, hi))
+            max_end[mid] = value
+            return value
+
+        build(0, len(items))
+        self._max_end = max_end
+        self._dirty = False
+
+    def overlapping(self, start: float, end: float, limit: Optional[int] = None) -> List[Interval]:
+        """
+        返回与 [start, end) 重叠的区间，按开始时间排序
+
+        :param limit: 找到指定数量后提前结束（冲突检测只需要 1 个）
+        """
+        if self._dirty:
+            self._build()
+        items, max_end = self._items, self._max_end
+        found: List[Interval] = []
+
+        def search(lo: int, hi: int) -> bool:
+            if lo >= hi:
+                return False
+            mid = (lo + hi) // 2
+            if max_end[mid] <= start:
+                return False  # 子树内所有区间都在查询窗口之前结束
+            if search(lo, mid):
+                return True
+            item = items[mid]
+            if item[0] >= end:
+                return False  # 右子树开始得更晚
+            if item[1] > start:
+                found.append(item)
+                if limit is not None and len(found) >= limit:
+                    return True
+            return search(mid + 1, hi)
+
+        search(0, len(items))
+        return found
+
+
+class ScheduleIndex:
+    """
+    热点用户的内存区间树（LRU，容量有上限）
+
+    首次访问时从 user_schedule 表加载该用户全部区间；本进程内的写入同步更新，
+    其他 worker 的写入在 ttl 秒后重新加载时可见。
+    """
+
+    def __init__(self, max_users: int = 1024, ttl: float = 30.0):
+        self._trees: "OrderedDict[str, Tuple[float, IntervalIndex]]" = OrderedDict()
+        self._max_users = max_users
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, user_id: str) -> IntervalIndex:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._trees.get(user_id)
+            if entry is not None and now - entry[0] < self._ttl:
+                self._trees.move_to_end(user_id)
+                return entry[1]
+
+        table = UserSchedule.__table__
+        rows = session.execute(
+            select(table.c.start_time, table.c.end_time, table.c.activity_id).where(table.c.user_id == user_id)
+        ).all()
+        tree = IntervalIndex((_ts(s), _ts(e), activity_id) for s, e, activity_id in rows)
+        with self._lock:
+            self._trees[user_id] = (now, tree)
+            self._trees.move_to_end(user_id)
+            while len(self._trees) > self._max_users:
+                self._trees.popitem(last=False)
+        return tree
+
+    def add(self, user_ids: Iterable[str], start: datetime, end: datetime, activity_id: str) -> None:
+        """已加载的用户同步插入，未加载的下次访问时从表中读取"""
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._trees.get(user_id)
+                if entry is not None:
+                    entry[1].add(_ts(start), _ts(end), activity_id)
+
+    def remove(self, user_ids: Iterable[str], activity_id: str) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._trees.get(user_id)
+                if entry is not None:
+                    entry[1].remove(activity_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trees.clear()
+
+
+schedule_index = ScheduleIndex()
+
+
+def find_conflicts(
+    session: Session,
+    user_id: str,
+    start: datetime,
+    end: datetime,
+    exclude: Optional[str] = None,
+) -> List[str]:
+    """
+    返回与 [start, end) 重叠的该用户其他活动 ID
+
+    :param exclude: 忽略的活动（修改自身时间时排除自己）
+    """
+    tree = schedule_index.get(session, user_id)
+    limit = None if exclude else 1
+    return [
+        key for _, _, key in tree.overlapping(_ts(start), _ts(end), limit=limit)
+        if key != exclude
+    ]
+
+
+def add_activity(session: Session, activity_id: str, user_ids: Iterable[str], start: datetime, end: datetime) -> None:
+    """为活动的每个成员写入日程行（调用方提交事务后调用 schedule_index.add）"""
+    for user_id in dict.fromkeys(user_ids):
+        session.add(UserSchedule(user_id=user_id, activity_id=activity_id, start_time=start, end_time=end))
+
+
+def reschedule_activity(
+    session: Session, activity_id: str, start: datetime, end: datetime, members: Iterable[str] = ()
+) -> List[str]:
+    """
+    修改活动所有成员的日程区间；活动尚无日程行（生成的活动首次设置时间）时为 members 写入
+
+    :param members: 活动的创建者与参与者
+    :return: 受影响的用户 ID（调用方提交后据此刷新内存索引）
+    """
+    table = UserSchedule.__table__
+    user_ids = [row[0] for row in session.execute(select(table.c.user_id).where(table.c.activity_id == activity_id))]
+    if not user_ids:
+        user_ids = list(dict.fromkeys(members))
+        add_activity(session, activity_id, user_ids, start, end)
+        return user_ids
+    session.execute(update(table).where(table.c.activity_id == activity_id).values(start_time=start, end_time=end))
+    return user_ids
+
+
+def remove_activity(session: Session, activity_id: str) -> List[str]:
+    """
+    删除活动的全部日程行（取消/驳回后不再占用日程）
+
+    :return: 受影响的用户 ID
+    """
+    table = UserSchedule.__table__
+    user_ids = [row[0] for row in session.execute(select(table.c.user_id).where(table.c.activity_id == activity_id))]
+    session.execute(delete(table).where(table.c.activity_id == activity_id))
+    return user_ids
+
+
+def calendar(session: Session, user_id: str, start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """用户在 [start, end) 内的活动，按开始时间排序"""
+    tree = schedule_index.get(session, user_id)
+    return [(key, _dt(s), _dt(e)) for s, e, key in tree.overlapping(_ts(start), _ts(end))]
+
+
+def free_slots(
+    session: Session,
+    user_ids: Iterable[str],
+    start: datetime,
+    end: datetime,
+    min_duration: float = 1.0,
+) -> List[Tuple[datetime, datetime]]:
+    """
+    一组用户在 [start, end) 内共同空闲、且不短于 min_duration 小时的时间段
+
+    合并所有成员在窗口内的忙碌区间后一次扫描求空隙。
+    """
+    window_start, window_end = _ts(start), _ts(end)
+    busy: List[Tuple[float, float]] = []
+    for user_id in dict.fromkeys(user_ids):
+        tree = schedule_index.get(session, user_id)
+        busy.extend((s, e) for s, e, _ in tree.overlapping(window_start, window_end))
+    busy.sort()
+
+    min_seconds = min_duration * 3600
+    slots: List[Tuple[datetime, datetime]] = []
+    cursor = window_start
+    for s, e in busy:
+        if s - cursor >= min_seconds:
+            slots.append((_dt(cursor), _dt(s)))
+        cursor = max(cursor, e)
+    if window_end - cursor >= min_seconds:
+        slots.append((_dt(cursor), _dt(window_end)))
+    return slots
+
+
+def rebuild_schedule(conn) -> int:
+    """
+    由 event / event_content 全量重建 user_schedule（迁移与纠错用）
+
+    生成后尚未设置时间的活动只有占位时间，不写入。
+
+    :return: 写入的行数
+    """
+    from sqlalchemy import insert
+    from schema.database import Event, EventContent
+
+    event_table, content_table, table = Event.__table__, EventContent.__table__, UserSchedule.__table__
+    rows = conn.execute(
+        select(
+            event_table.c.activity_id, event_table.c.owner_id, event_table.c.participants_id,
+            event_table.c.created_at, content_table.c.start_time, content_table.c.duration,
+        )
+        .join(content_table, content_table.c.activity_id == event_table.c.activity_id)
+        .where(event_table.c.status.not_in(INACTIVE_STATUSES))
+    ).all()
+    records = []
+    for activity_id, owner_id, participants, created_at, start_time, duration in rows:
+        if start_time is None or is_placeholder(activity_id, created_at, start_time, duration):
+            continue
+        start, end = activity_interval(start_time, duration)
+        for user_id in dict.fromkeys([owner_id, *(participants or [])]):
+            records.append(dict(user_id=user_id, activity_id=activity_id, start_time=start, end_time=end))
+    conn.execute(delete(table))
+    if records:
+        conn.execute(insert(table), records)
+    schedule_index.clear()
+    return len(records)
+
+
+# 基准：单个用户持有 10k 个活动时的冲突检测 / 日历查询
+if __name__ == "__main__":
+    import random
+    import timeit
+    from loguru import logger
+    from sqlalchemy import create_engine, insert
+
+    rng = random.Random(0)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    activities = []
+    for i in range(10_000):
+        start = base + timedelta(hours=rng.randint(0, 24 * 365 * 3))
+        activities.append((start, start + timedelta(hours=rng.choice([1, 2, 3.5])), f"a{i:05x}"))
+    probes = [base + timedelta(hours=rng.randint(0, 24 * 365 * 3)) for _ in range(1000)]
+
+    tree = IntervalIndex((_ts(s), _ts(e), key) for s, e, key in activities)
+    elapsed = timeit.timeit(lambda: tree._build(), number=10) / 10
+    logger.info(f"建树 10k 区间: {elapsed * 1000:.2f} ms")
+
+    def tree_check():
+        for p in probes:
+            tree.overlapping(_ts(p), _ts(p + timedelta(hours=2)), limit=1)
+
+    def linear_check():
+        for p in probes:
+            s, e = p, p + timedelta(hours=2)
+            any(a < e and b > s for a, b, _ in activities)
+
+    per_tree = timeit.timeit(tree_check, number=5) / 5 / len(probes)
+    per_linear = timeit.timeit(linear_check, number=1) / len(probes)
+    logger.info(f"冲突检测 区间树: {per_tree * 1e6:.1f} µs/次, 线性扫描: {per_linear * 1e6:.1f} µs/次")
+
+    engine = create_engine("sqlite://")
+    UserSchedule.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(UserSchedule.__table__), [
+            dict(user_id="u1", activity_id=key, start_time=s, end_time=e) for s, e, key in activities
+        ])
+    with Session(engine) as session:
+        table = UserSchedule.__table__
+
+        def sql_check():
+            for p in probes[:200]:
+                session.execute(
+                    select(table.c.activity_id).where(
+                        table.c.user_id == "u1", table.c.start_time < p + timedelta(hours=2), table.c.end_time > p
+                    ).limit(1)
+                ).first()
+
+        per_sql = timeit.timeit(sql_check, number=1) / 200
+        logger.info(f"冲突检测 SQL (user_id, start_time) 索引: {per_sql * 1e6:.1f} µs/次")
+
+        schedule_index.clear()
+        load = timeit.timeit(lambda: (schedule_index.clear(), schedule_index.get(session, "u1")), number=3) / 3
+        logger.info(f"冷加载 10k 区间到内存: {load * 1000:.1f} ms")
+        month = calendar(session, "u1", base, base + timedelta(days=30))
+        logger.info(f"日历 30 天: {len(month)} 个活动")
+        slots = free_slots(session, ["u1"], base, base + timedelta(days=7), min_duration=4)
+        logger.info(f"7 天内 ≥4 小时空闲段: {len(slots)} 个")
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    请求合并（single-flight）
+
+    同一 key 的并发调用只执行一次 fetch，其余调用等待并共享同一结果（或同一异常）。
+    只记录正在执行中的 key，执行结束立即移除，不缓存结果，因此内存占用有上限。
+
+    :param max_inflight: 同时在途的 key 上限，超过后新 key 直接执行不合并
+    """
+
+    def __init__(self, max_inflight: int = 1024):
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._max_inflight = max_inflight
+        self.stats = {"calls": 0, "executions": 0, "shared": 0, "bypassed": 0}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行或加入 key 对应的在途调用
+
+        :param key: 合并键，例如 ("detail", activity_id)
+        :param fetch: 无参协程工厂，只有领头请求会调用
+        :return: fetch 的结果
+        """
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["shared"] += 1
+            # shield：某个等待者被取消（客户端断开）不影响其他等待者
+            return await asyncio.shield(task)
+
+        if len(self._inflight) >= self._max_inflight:
+            self.stats["bypassed"] += 1
+            return await fetch()
+
+        self.stats["executions"] += 1
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消时，避免 "exception was never retrieved" 警告
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"single-flight fetch failed for {key!r}: {task.exception()!r}")
+
+
+# 活动详情 / 卡片读路径共用的合并器
+activity_reads = SingleFlight()
+
+
+# 惊群测试：N 个并发请求同一活动的详情/卡片接口，统计实际执行的 SQL 语句数
+# python -m database.singleflight
+if __name__ == "__main__":
+    import time
+    from sqlalchemy import event as sa_event
+    from benchmarks.harness import bench_app
+    # 以脚本运行时本模块是 __main__，需使用应用实际导入的合并器实例
+    from database.singleflight import activity_reads
+
+    async def herd(client, path: str, concurrency: int, **kwargs) -> float:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.request(url=path, **kwargs) for _ in range(concurrency)))
+        assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+        return (time.perf_counter() - start) * 1000
+
+    async def main(concurrency: int = 500):
+        async with bench_app(events=200) as (app, client, data):
+            statements = 0
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                nonlocal statements
+                statements += 1
+
+            engines = {app.state.engine, app.state.read_engine}
+            # bench_app 将日志级别调为 WARNING，结果直接打印
+            for engine in engines:
+                sa_event.listen(engine, "before_cursor_execute", count)
+
+            activity_id = data.activity_ids[0]
+            cases = [
+                ("details", f"/api/activities/{activity_id}/details",
+                 dict(method="GET", params={"user_id": data.user_ids[0], "token": "t"})),
+                ("card", f"/api/activities/{activity_id}/generate-card",
+                 dict(method="POST", json={"user_id": data.user_ids[0], "token": "t", "activity_id": activity_id})),
+            ]
+            for name, path, kwargs in cases:
+                await herd(client, path, 1, **kwargs)  # 预热（卡片首次渲染并回写）
+                # 不合并：在途上限设为 0，每个请求都直接查询
+                activity_reads._max_inflight = 0
+                statements = 0
+                plain_ms = await herd(client, path, concurrency, **kwargs)
+                plain = statements
+                # 合并
+                activity_reads._max_inflight = 1024
+                statements = 0
+                coalesced_ms = await herd(client, path, concurrency, **kwargs)
+                print(f"{name} 无合并: {concurrency} 个请求 -> {plain} 条 SQL, {plain_ms:.1f} ms")
+                print(f"{name} single-flight: {concurrency} 个请求 -> {statements} 条 SQL, {coalesced_ms:.1f} ms")
+            assert len(activity_reads) == 0, "在途表未清空"
+            print(f"统计: {activity_reads.stats}")
+
+            for engine in engines:
+                sa_event.remove(engine, "before_cursor_execute", count)
+
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session
+from schema.database import Event, EventStatusLog
+from schema.timeutil import utcnow
+
+# 状态机：当前状态 -> 允许的下一状态
+TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    "created": ("pending", "cancelled"),
+    "pending": ("created", "approved", "rejected", "cancelled"),
+    "approved": ("finished", "cancelled"),
+    "rejected": (),
+    "finished": (),
+    "cancelled": (),
+}
+
+# 创建者可设置的状态（提交审核 / 撤回）
+OWNER_STATUSES = ("created", "pending")
+# 管理员可设置的状态
+ADMIN_STATUSES = ("approved", "rejected", "cancelled", "finished")
+# 审核接口兼容的旧写法
+DECISION_ALIASES = {"approve": "approved", "reject": "rejected"}
+
+# PostgreSQL 上串行化状态日志写入的事务级 advisory lock 键
+STATUS_LOG_LOCK_KEY = 0x6D617465
+
+
+class InvalidTransition(ValueError):
+    """当前状态不允许转到目标状态"""
+
+
+class VersionConflict(Exception):
+    """活动已被其他请求修改（版本不一致）"""
+
+
+def normalize_status(value: str) -> str:
+    return DECISION_ALIASES.get(value, value)
+
+
+def check_transition(from_status: str, to_status: str) -> None:
+    if to_status not in TRANSITIONS:
+        raise ValueError(f"无效的状态: {to_status}")
+    if to_status != from_status and to_status not in TRANSITIONS.get(from_status, ()):
+        raise InvalidTransition(f"活动状态不能从 {from_status} 变为 {to_status}")
+
+
+def _append_log(session: Session, entry: EventStatusLog) -> None:
+    """
+    追加状态日志
+
+    变更流以 seq 为游标，要求 seq 按提交顺序递增。SQLite 写事务本身串行，天然满足；
+    PostgreSQL 的序列值在插入时分配，先拿到 seq 的事务可能后提交，消费者会跳过这一行。
+    因此在 PostgreSQL 上先取事务级 advisory lock，提交时释放，日志写入按提交顺序分配 seq。
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": STATUS_LOG_LOCK_KEY})
+    session.add(entry)
+
+
+def record_created(session: Session, event: Event, actor_id: str) -> None:
+    """新建活动时记录初始状态（与活动写入在同一事务，由调用方提交）"""
+    _append_log(session, EventStatusLog(
+        activity_id=event.activity_id,
+        from_status=None,
+        to_status=event.status,
+        version=event.version or 0,
+        actor_id=actor_id,
+        source="create",
+        changed_at=event.created_at or utcnow(),
+    ))
+
+
+def write_event(
+    session: Session,
+    event: Event,
+    actor_id: str,
+    source: str,
+    to_status: Optional[str] = None,
+    expected_version: Optional[int] = None,
+    now: datetime = None,
+) -> Optional[EventStatusLog]:
+    """
+    以版本号为条件更新活动（UPDATE ... WHERE version = 读取时的版本），状态变化时追加变更日志
+
+    与其他写入在同一事务，由调用方提交。
+
+    :param event: 本次请求读取的 Event
+    :param to_status: 目标状态，None 或与当前相同表示不改状态，仅递增版本
+    :param expected_version: 客户端读取到的版本，None 表示以本次请求读取时的版本为准
+    :raises InvalidTransition: 状态机不允许该转移
+    :raises VersionConflict: 活动在读取后已被修改
+    :return: 新增的日志记录；状态未变化时为 None
+    """
+    now = now or utcnow()
+    version = event.version or 0
+    if expected_version is not None and expected_version != version:
+        raise VersionConflict(f"活动已被修改（当前版本 {version}）")
+    from_status = event.status
+    changed = to_status is not None and to_status != from_status
+    if changed:
+        check_transition(from_status, to_status)
+
+    values = dict(version=version + 1, updated_at=now)
+    if changed:
+        values["status"] = to_status
+    table = Event.__table__
+    result = session.execute(
+        update(table)
+        .where(table.c.activity_id == event.activity_id, table.c.version == version)
+        .values(**values)
+    )
+    if result.rowcount != 1:
+        raise VersionConflict("活动已被其他请求修改，请刷新后重试")
+    # 同步到已加载的对象，避免提交时重复写入
+    for key, value in values.items():
+        set_committed_value(event, key, value)
+
+    if not changed:
+        return None
+    entry = EventStatusLog(
+        activity_id=event.activity_id,
+        from_status=from_status,
+        to_status=to_status,
+        version=version + 1,
+        actor_id=actor_id,
+        source=source,
+        changed_at=now,
+    )
+    _append_log(session, entry)
+    return entry
+
+
+def changes_after(session: Session, after: int, limit: int) -> List[EventStatusLog]:
+    """变更流：seq 大于游标的日志，按 seq 升序（seq 按提交顺序分配，见 _append_log）"""
+    return session.query(EventStatusLog).filter(EventStatusLog.seq > after).order_by(EventStatusLog.seq).limit(limit).all()
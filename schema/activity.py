@@ -89,6 +89,16 @@ class ActivityDetailResponse(BaseModel):
     participants: List[str]
     created_at: str
     last_updated: str
+    version: int = 0
+
+class ActivityBatchDetailRequest(BaseModel):
+    user_id: str
+    token: str
+    activity_ids: List[str]
+
+class ActivityBatchDetailResponse(BaseModel):
+    items: List[ActivityDetailResponse]  # 按请求顺序，已去重
+    missing: List[str]  # 不存在的活动 ID
 
 class ActivityUpdateRequirements(BaseModel):
     group_size: int
@@ -106,12 +116,14 @@ class ActivityUpdateRequest(BaseModel):
     start_time: Optional[str] = None
     duration: Optional[float] = None
     requirements: Optional[ActivityUpdateRequirements] = None
-    status: Optional[str] = None  # e.g.,"created","pending", "approved", "rejected","cancelled","finished"
+    status: Optional[str] = None  # 创建者只能设置 "created" / "pending"
+    version: Optional[int] = None  # 读取到的活动版本，不一致时返回 409
 
 class ActivityUpdateResponse(BaseModel):
     activity_id: str
     feedback: str
     updated_at: str
+    version: int = 0
 
 
 
@@ -152,4 +164,34 @@ class ActivityHistoryRequest(BaseModel):
 
 class ActivityHistoryResponse(BaseModel):
     user_id: str
-    history: List[ActivityHistoryItem]
\ No newline at end of file
+    history: List[ActivityHistoryItem]
+
+
+class LeaderboardItem(BaseModel):
+    activity_id: str
+    title: str
+    theme: str
+    location: str
+    rating: Optional[float] = None
+    rating_count: int
+    trending_score: float  # 按当前时刻衰减后的加权评价数
+
+class LeaderboardResponse(BaseModel):
+    kind: str  # "top_rated" or "trending"
+    scope: str  # "all", "theme", "location"
+    scope_value: Optional[str] = None
+    items: List[LeaderboardItem]
+
+class StatusChangeItem(BaseModel):
+    seq: int
+    activity_id: str
+    from_status: Optional[str] = None
+    to_status: str
+    version: int
+    actor_id: str
+    source: str
+    changed_at: str
+
+class StatusChangeFeedResponse(BaseModel):
+    changes: List[StatusChangeItem]
+    next_after: int  # 下次请求的 after 游标
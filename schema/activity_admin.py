@@ -21,11 +21,13 @@ class AdminActivityUpdateRequest(BaseModel):
     user_id: str
     token: str
     activity_id: str
-    status: str  # "approve" or "reject"
+    status: str  # "approve" / "reject"，或目标状态名 "approved" / "rejected" / "cancelled" / "finished"
     reviewer_id: str
     comment: str = ""
+    version: Optional[int] = None  # 读取到的活动版本，不一致时返回 409
 
 class AdminActivityUpdateResponse(BaseModel):
     activity_id: str
     new_status: str
-    reviewed_at: str
\ No newline at end of file
+    reviewed_at: str
+    version: int
\ No newline at end of file
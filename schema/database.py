@@ -1,8 +1,9 @@
 from sqlalchemy.exc import OperationalError
 from sqlmodel import Field, Session, SQLModel, create_engine
 from datetime import datetime
-from sqlalchemy import Column, JSON, DateTime, Float, Integer, String, select
+from sqlalchemy import Column, JSON, DateTime, Float, Index, Integer, String, Table, select
 from typing import List, Optional, Dict
+from schema.timeutil import UTCDateTime
 
 class Event(SQLModel, table=True):
     __tablename__ = "event"
@@ -11,19 +12,20 @@ class Event(SQLModel, table=True):
     owner_id: str
     participants_id: List[str] = Field(sa_column=Column(JSON))
     status: str
-    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
-    updated_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
+    created_at: datetime = Field(sa_column=Column(UTCDateTime()))
+    updated_at: datetime = Field(sa_column=Column(UTCDateTime()))
     rating: Optional[float] = Field(sa_column=Column(Float))
     rating_id: List[str] = Field(sa_column=Column(JSON))
+    version: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))  # 每次写入加一，用于乐观并发控制
 
 class EventContent(SQLModel, table=True):
     __tablename__ = "event_content"
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    activity_id: str = Field(foreign_key="event.activity_id")
+    activity_id: str = Field(foreign_key="event.activity_id", index=True)
     title: str
     description: str
-    start_time: datetime = Field(sa_column=Column(DateTime(timezone=True)))
+    start_time: datetime = Field(sa_column=Column(UTCDateTime(), index=True))
     duration: Optional[float] = Field(sa_column=Column(Float))
     theme: str
     location: str
@@ -37,7 +39,7 @@ class EventRating(SQLModel, table=True):
     
     rating_id: str = Field(primary_key=True)
     status: str
-    submitted_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
+    submitted_at: datetime = Field(sa_column=Column(UTCDateTime()))
     activity_id: str = Field(foreign_key="event.activity_id")
     rating: float
     rater_id: str
@@ -48,7 +50,7 @@ class PartnerRating(SQLModel, table=True):
     
     rating_id: str = Field(primary_key=True)
     status: str
-    submitted_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
+    submitted_at: datetime = Field(sa_column=Column(UTCDateTime()))
     user_id: str
     rater_id: str
     tags: List[str] = Field(sa_column=Column(JSON))
@@ -59,7 +61,7 @@ class EventReview(SQLModel, table=True):
     
     review_id: str = Field(primary_key=True)
     status: str
-    submitted_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
+    submitted_at: datetime = Field(sa_column=Column(UTCDateTime()))
     activity_id: str = Field(foreign_key="event.activity_id")
     reviewer_id: str
     comment: str
@@ -70,6 +72,101 @@ class AdminActivityAction(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     activity_id: str = Field(foreign_key="event.activity_id")
     reviewer_id: str
-    decision: str  # "approve" or "reject"
+    decision: str  # 审核后的状态："approved" / "rejected" / "cancelled" / "finished"
     comment: str
-    operated_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
\ No newline at end of file
+    operated_at: datetime = Field(sa_column=Column(UTCDateTime()))
+
+class EventStatusLog(SQLModel, table=True):
+    __tablename__ = "event_status_log"
+    __table_args__ = {"sqlite_autoincrement": True}  # seq 不复用，可作为变更流游标
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    activity_id: str = Field(foreign_key="event.activity_id", index=True)
+    from_status: Optional[str] = None  # 创建时为空
+    to_status: str
+    version: int  # 变更后的活动版本
+    actor_id: str
+    source: str  # "create" / "owner" / "admin"
+    changed_at: datetime = Field(sa_column=Column(UTCDateTime()))
+
+class SchemaVersion(SQLModel, table=True):
+    __tablename__ = "schema_version"
+
+    id: int = Field(default=1, primary_key=True)  # 单行表
+    version: int
+    applied_at: datetime = Field(sa_column=Column(UTCDateTime()))
+
+class UserReputation(SQLModel, table=True):
+    __tablename__ = "user_reputation"
+
+    user_id: str = Field(primary_key=True)
+    rating_count: int = 0
+    tag_histogram: Dict[str, int] = Field(sa_column=Column(JSON))
+    score: float = 0.0  # 按 last_rated_at 时刻衰减后的加权评价数
+    last_rated_at: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime()))
+    updated_at: datetime = Field(sa_column=Column(UTCDateTime()))
+
+class UserSchedule(SQLModel, table=True):
+    __tablename__ = "user_schedule"
+    __table_args__ = (
+        Index("ix_user_schedule_user_start", "user_id", "start_time"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str
+    activity_id: str = Field(index=True)
+    start_time: datetime = Field(sa_column=Column(UTCDateTime()))
+    end_time: datetime = Field(sa_column=Column(UTCDateTime()))  # 不含，区间为 [start_time, end_time)
+
+
+class ActivityCard(SQLModel, table=True):
+    __tablename__ = "activity_card"
+
+    activity_id: str = Field(primary_key=True)  # 不设外键：缓存可随时删除重建
+    etag: str
+    template_version: int
+    json_payload: str
+    html_payload: str
+    svg_payload: str
+    rendered_at: datetime = Field(sa_column=Column(UTCDateTime()))
+
+
+# ---- 归档表：终态活动超过保留期后从热表整体迁出 ----
+
+def _archive_table(table: Table, *extra) -> Table:
+    """
+    复制热表的列（不含外键）作为归档表，按 activity_id 建索引
+
+    子表的自增 id / 随机 rating_id 在热表删除后可能被复用，归档表不沿用热表主键，
+    改用自己的 archive_id，热表主键只作为普通列保留。
+    """
+    name = f"{table.name}_archive"
+    own_key = not table.c.activity_id.primary_key
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key and not own_key, nullable=c.nullable)
+        for c in table.columns
+    ]
+    if own_key:
+        columns.insert(0, Column("archive_id", Integer, primary_key=True, autoincrement=True))
+        extra += (Index(f"ix_{name}_activity_id", "activity_id"),)
+    return Table(name, SQLModel.metadata, *columns, *extra)
+
+
+event_archive = _archive_table(
+    Event.__table__,
+    Column("archived_at", UTCDateTime()),
+    Index("ix_event_archive_owner_id", "owner_id"),
+)
+event_content_archive = _archive_table(EventContent.__table__)
+event_rating_archive = _archive_table(EventRating.__table__)
+event_review_archive = _archive_table(EventReview.__table__)
+admin_activity_action_archive = _archive_table(AdminActivityAction.__table__)
+event_status_log_archive = _archive_table(EventStatusLog.__table__)
+
+# 归档活动的成员（创建者与参与者），用于历史记录回查
+activity_member_archive = Table(
+    "activity_member_archive",
+    SQLModel.metadata,
+    Column("user_id", String, primary_key=True),
+    Column("activity_id", String, primary_key=True, index=True),
+)
@@ -0,0 +1,30 @@
+from typing import List, Dict
+from pydantic import BaseModel
+
+
+class PartnerRatingRequest(BaseModel):
+    user_id: str  # 评价人
+    token: str
+    tags: List[str]
+    comment: str = ""
+
+class PartnerRatingResponse(BaseModel):
+    rating_id: str
+    user_id: str  # 被评价人
+    status: str
+    submitted_at: str
+
+class ReputationResponse(BaseModel):
+    user_id: str
+    rating_count: int
+    tag_histogram: Dict[str, int]
+    score: float
+    last_rated_at: str
+
+class ReputationBatchRequest(BaseModel):
+    user_id: str
+    token: str
+    user_ids: List[str]
+
+class ReputationBatchResponse(BaseModel):
+    reputations: List[ReputationResponse]
@@ -0,0 +1,28 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class CalendarItem(BaseModel):
+    activity_id: str
+    start_time: str
+    end_time: str
+
+class CalendarResponse(BaseModel):
+    user_id: str
+    items: List[CalendarItem]
+
+class FreeSlotsRequest(BaseModel):
+    user_id: str
+    token: str
+    user_ids: List[str]
+    start_time: str  # ISO datetime string
+    end_time: str  # ISO datetime string
+    min_duration: float = 1.0  # 小时
+
+class FreeSlot(BaseModel):
+    start_time: str
+    end_time: str
+
+class FreeSlotsResponse(BaseModel):
+    user_ids: List[str]
+    slots: List[FreeSlot]
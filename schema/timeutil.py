@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
+
+
+def utcnow() -> datetime:
+    """当前时间（UTC，带时区）"""
+    return datetime.now(timezone.utc)
+
+
+def parse_iso8601(value: str) -> datetime:
+    """
+    严格解析 ISO-8601 时间字符串并转换为 UTC
+
+    基于 datetime.fromisoformat（C 实现），支持 "Z" 与 "+08:00" 等偏移；
+    不带时区的时间按 UTC 处理。非 ISO 格式（如 "01/02/03"）直接报错，不做猜测。
+
+    :param value: ISO-8601 字符串，例如 "2025-10-01T09:00:00+08:00"
+    :return: 带 UTC 时区的 datetime
+    :raises ValueError: 格式无效
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的 ISO-8601 时间: {value!r}")
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    统一以 UTC 存储的时间列
+
+    写入时转换为 UTC（无时区值视为 UTC）；SQLite 不保存时区，存为 UTC 墙上时间。
+    读取时总是返回带 UTC 时区的 datetime，范围查询与索引排序保持一致。
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.astimezone(timezone.utc)
+        if dialect.name == "sqlite":
+            return value.replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+
+# 解析吞吐对比：fromisoformat vs dateutil
+if __name__ == "__main__":
+    import timeit
+    from loguru import logger
+
+    samples = ["2025-10-01T09:00:00+08:00", "2025-10-01T01:00:00Z", "2025-10-01T01:00:00.123456"]
+    number = 100_000
+
+    elapsed = timeit.timeit(lambda: [parse_iso8601(s) for s in samples], number=number)
+    logger.info(f"parse_iso8601: {number * len(samples) / elapsed:,.0f} 次/秒")
+
+    try:
+        from dateutil import parser
+    except ImportError:
+        logger.warning("未安装 python-dateutil，跳过对比")
+    else:
+        elapsed = timeit.timeit(lambda: [parser.parse(s) for s in samples], number=number // 10)
+        logger.info(f"dateutil.parser.parse: {number // 10 * len(samples) / elapsed:,.0f} 次/秒")
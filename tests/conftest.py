@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 仓库根目录本身是包，测试直接以根目录作为导入起点（与 python -m web.testpage 一致）
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,105 @@
+import asyncio
+from benchmarks.harness import bench_app
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_generate_twice_same_day():
+    async def go():
+        async with bench_app(events=10) as (app, client, data):
+            body = {
+                "user_id": "creator", "token": "t", "session_id": "s1",
+                "input_data": {"prompt": "秋日摄影", "theme": "摄影", "location": "香山", "budget": "200元"},
+            }
+            first = await client.post("/api/activities/create", json=body)
+            second = await client.post("/api/activities/create", json=body)
+            return first, second
+
+    first, second = _run(go())
+    assert first.status_code == 200, first.text
+    assert second.status_code == 200, second.text
+    assert first.json()["activity_id"] != second.json()["activity_id"]
+
+
+
+
+def test_generated_placeholder_does_not_occupy_schedule():
+    from database.schedule import rebuild_schedule, schedule_index
+
+    async def go():
+        async with bench_app(events=10) as (app, client, data):
+            body = {
+                "user_id": "creator", "token": "t", "session_id": "s1",
+                "input_data": {"prompt": "秋日摄影", "theme": "摄影", "location": "香山", "budget": "200元"},
+            }
+            first = (await client.post("/api/activities/create", json=body)).json()
+            second = (await client.post("/api/activities/create", json=body)).json()
+            start = first["generated_activity"]["start_time"][:10]
+            window = {"from": f"{start}T00:00:00Z", "to": f"{start}T23:59:59Z", "token": "t"}
+            before = (await client.get("/api/users/creator/calendar", params=window)).json()["items"]
+            updated = await client.put(
+                f"/api/activities/{second['activity_id']}/update",
+                json={"user_id": "creator", "token": "t", "activity_id": second["activity_id"], "duration": 1.5},
+            )
+            after = (await client.get("/api/users/creator/calendar", params=window)).json()["items"]
+            with app.state.engine.begin() as conn:
+                rebuild_schedule(conn)
+            schedule_index.clear()
+            rebuilt = (await client.get("/api/users/creator/calendar", params=window)).json()["items"]
+            return second["activity_id"], before, updated, after, rebuilt
+
+    second_id, before, updated, after, rebuilt = _run(go())
+    assert before == []
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["feedback"] == "success"
+    # 设置时长后写入日程；仍是占位时间的活动在重建后也不占用日程
+    assert [item["activity_id"] for item in after] == [second_id]
+    assert rebuilt == after
+
+def test_overlapping_manual_create_conflicts():
+    async def go():
+        async with bench_app(events=10) as (app, client, data):
+            body = {
+                "user_id": "u9", "token": "t", "title": "跨年登山", "description": "", "theme": "徒步",
+                "location": "香山", "budget": 0, "start_time": "2031-01-01T10:00:00+08:00",
+                "requirements": {"group_size": 4, "activity_tags": []},
+            }
+            first = await client.post("/api/activities/manual-create", json=body)
+            second = await client.post("/api/activities/manual-create", json=dict(body, start_time="2031-01-01T11:00:00+08:00"))
+            return first, second
+
+    first, second = _run(go())
+    assert first.status_code == 200, first.text
+    assert second.status_code == 409
+    assert first.json()["activity_id"] in second.json()["detail"]
+
+def test_failed_feedback_commit_leaves_leaderboard_untouched(monkeypatch):
+    from sqlmodel import Session, select
+    from database.leaderboard import leaderboards
+    from schema.database import Event
+
+    async def go():
+        async with bench_app(events=50) as (app, client, data):
+            with Session(app.state.engine) as session:
+                activity_id = session.exec(select(Event.activity_id).where(Event.status == "approved")).first()
+                leaderboards.rebuild(session)
+            before = leaderboards._items.get(activity_id)
+            body = {"user_id": "new_rater", "token": "t", "activity_id": activity_id, "rating": 1.0, "comment": "差"}
+
+            def fail(self):
+                raise RuntimeError("disk I/O error")
+
+            with monkeypatch.context() as patch:
+                patch.setattr(Session, "commit", fail)
+                failed = await client.post(f"/api/activities/{activity_id}/feedback", json=body)
+            after_failure = leaderboards._items.get(activity_id)
+            ok = await client.post(f"/api/activities/{activity_id}/feedback", json=body)
+            return failed, before, after_failure, ok, leaderboards._items.get(activity_id)
+
+    failed, before, after_failure, ok, after_success = _run(go())
+    assert failed.status_code == 500
+    assert after_failure == before
+    assert ok.status_code == 200, ok.text
+    assert after_success["rating_count"] == before["rating_count"] + 1
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, text
+from sqlmodel import SQLModel, create_engine
+from database.archive import archive_events, load_archived_ratings
+from database.migrations import MIGRATIONS
+from schema.database import AdminActivityAction, Event, EventContent, EventRating, event_content_archive
+
+FINISHED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _finished_activity(conn, activity_id: str) -> None:
+    """写入一个早已结束的活动；热表删除后 SQLite 会复用 id，随机 rating_id 也可能重复"""
+    conn.execute(insert(Event.__table__).values(
+        activity_id=activity_id, owner_id="u1", participants_id=["u1"], status="finished",
+        created_at=FINISHED_AT, updated_at=FINISHED_AT, rating=4.0, rating_id=["f0001"],
+    ))
+    conn.execute(insert(EventContent.__table__).values(
+        id=1, activity_id=activity_id, title=activity_id, description="", start_time=FINISHED_AT, duration=None,
+        theme="徒步", location="西山", budget=0, group_size=1, recommended_equipment=[], activity_tags=[],
+    ))
+    conn.execute(insert(EventRating.__table__).values(
+        rating_id="f0001", status="submitted", submitted_at=FINISHED_AT, activity_id=activity_id,
+        rating=4.0, rater_id="u2", comment="",
+    ))
+    conn.execute(insert(AdminActivityAction.__table__).values(
+        id=1, activity_id=activity_id, reviewer_id="admin", decision="approved", comment="", operated_at=FINISHED_AT,
+    ))
+
+
+def test_archive_twice_with_reused_child_keys(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    SQLModel.metadata.create_all(engine)
+    for activity_id in ("first", "second"):
+        with engine.begin() as conn:
+            _finished_activity(conn, activity_id)
+        assert archive_events(engine, retention=timedelta(days=1)) == 1
+
+    with engine.connect() as conn:
+        titles = conn.execute(select(event_content_archive.c.id, event_content_archive.c.title)).all()
+        assert sorted(titles) == [(1, "first"), (1, "second")]
+        assert [r.rating_id for r in load_archived_ratings(conn, "second")] == ["f0001"]
+
+
+def test_rekey_archive_tables_keeps_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # 版本 8 的结构：归档表沿用热表主键
+        conn.execute(text("DROP TABLE event_content_archive"))
+        conn.execute(text(
+            "CREATE TABLE event_content_archive (id INTEGER PRIMARY KEY, activity_id VARCHAR, title VARCHAR, "
+            "description VARCHAR, start_time DATETIME, duration FLOAT, theme VARCHAR, location VARCHAR, "
+            "budget INTEGER, group_size INTEGER, recommended_equipment JSON, activity_tags JSON)"
+        ))
+        conn.execute(text("CREATE INDEX ix_event_content_archive_activity_id ON event_content_archive (activity_id)"))
+        conn.execute(text(
+            "INSERT INTO event_content_archive (id, activity_id, title, description, theme, location, budget, "
+            "group_size, recommended_equipment, activity_tags) VALUES (1, 'old', '旧活动', '', '徒步', '西山', 0, 1, '[]', '[]')"
+        ))
+
+    with engine.begin() as conn:
+        MIGRATIONS[9](conn)
+    with engine.begin() as conn:
+        _finished_activity(conn, "new")
+    assert archive_events(engine, retention=timedelta(days=1)) == 1
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(event_content_archive.c.activity_id, event_content_archive.c.id)).all()
+    assert sorted(rows) == [("new", 1), ("old", 1)]
@@ -0,0 +1,24 @@
+import asyncio
+import os
+from pathlib import Path
+from benchmarks.harness import bench_app
+from database.lifetime import DATABASE_PATH_ENV, SCHEMA_READY_ENV
+from web.ratelimit import RATELIMIT_DISABLED_ENV
+
+
+def test_bench_app_restores_process_state(monkeypatch):
+    monkeypatch.setenv(DATABASE_PATH_ENV, "/srv/mate/event_management.db")
+    monkeypatch.setenv(SCHEMA_READY_ENV, "1")
+    monkeypatch.delenv(RATELIMIT_DISABLED_ENV, raising=False)
+
+    async def go():
+        async with bench_app(events=5) as (app, client, data):
+            inside = os.environ[DATABASE_PATH_ENV], os.environ.get(SCHEMA_READY_ENV), os.environ[RATELIMIT_DISABLED_ENV]
+        return inside
+
+    db_path, schema_ready, disabled = asyncio.new_event_loop().run_until_complete(go())
+    assert schema_ready is None and disabled == "1"
+    assert not Path(db_path).parent.exists()
+    assert os.environ[DATABASE_PATH_ENV] == "/srv/mate/event_management.db"
+    assert os.environ[SCHEMA_READY_ENV] == "1"
+    assert RATELIMIT_DISABLED_ENV not in os.environ
@@ -0,0 +1,99 @@
+import asyncio
+from starlette.requests import Request
+from benchmarks.harness import bench_app
+from database.lifetime import LAST_WRITE_COOKIE, read_engine, recent_writers
+
+
+def test_last_write_cookie_routes_reads_to_primary_on_any_worker():
+    async def go():
+        async with bench_app(events=10) as (app, client, data):
+            app.state.sticky_reads = True
+            body = {
+                "user_id": "writer", "token": "t", "session_id": "s1",
+                "input_data": {"prompt": "秋日摄影", "theme": "摄影", "location": "香山", "budget": "200元"},
+            }
+            response = await client.post("/api/activities/create", json=body)
+            # 模拟下一个请求落到没有进程内记录的 worker
+            recent_writers._written.clear()
+
+            def request(cookie: str = None) -> Request:
+                headers = [(b"cookie", cookie.encode())] if cookie else []
+                return Request({"type": "http", "app": app, "headers": headers})
+
+            cookie = f"{LAST_WRITE_COOKIE}={response.cookies[LAST_WRITE_COOKIE]}"
+            return response, [
+                read_engine(request(cookie), "writer") is app.state.engine,
+                read_engine(request(), "writer") is app.state.engine,
+                read_engine(request(f"{LAST_WRITE_COOKIE}=0"), "writer") is app.state.engine,
+            ]
+
+    response, on_primary = asyncio.new_event_loop().run_until_complete(go())
+    assert response.status_code == 200, response.text
+    # 带 cookie 走主库；没有 cookie 或已过期时走读连接池
+    assert on_primary == [True, False, False]
+
+
+def test_server_database_reads_from_replica_except_recent_writer(tmp_path, monkeypatch):
+    """两个 SQLite 文件替代主库与只读副本：副本里只有旧数据，可据此区分读请求落在哪个库"""
+    import httpx
+    from sqlalchemy import insert
+    from sqlmodel import SQLModel, create_engine
+    from database.lifetime import DATABASE_REPLICA_URL_ENV, DATABASE_URL_ENV, SCHEMA_READY_ENV
+    from schema.database import Event
+    from schema.timeutil import utcnow
+
+    monkeypatch.setenv(DATABASE_URL_ENV, f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv(DATABASE_REPLICA_URL_ENV, f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.delenv(SCHEMA_READY_ENV, raising=False)
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    SQLModel.metadata.create_all(replica)
+    now = utcnow()
+    with replica.begin() as conn:
+        conn.execute(insert(Event.__table__), [
+            dict(
+                activity_id=f"replica_{owner}", owner_id=owner, participants_id=[owner], status="created",
+                created_at=now, updated_at=now, rating=None, rating_id=[],
+            )
+            for owner in ("writer", "reader")
+        ])
+    replica.dispose()
+
+    from web.testpage import app
+
+    async def go():
+        async with app.router.lifespan_context(app):
+            sticky, separate = app.state.sticky_reads, app.state.read_engine is not app.state.engine
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://mate.test") as writer, \
+                    httpx.AsyncClient(transport=transport, base_url="http://mate.test") as reader:
+                async def history(client, user_id):
+                    params = {"user_id": user_id, "token": "t"}
+                    response = await client.get("/api/activities/history", params=params)
+                    return {item["activity_id"] for item in response.json()["history"]}
+
+                seen = {"before_write": await history(writer, "writer")}
+                created = await writer.post("/api/activities/manual-create", json={
+                    "user_id": "writer", "token": "t", "title": "夜跑", "description": "", "theme": "跑步",
+                    "location": "奥森", "budget": 0, "start_time": "2031-02-01T20:00:00+08:00",
+                    "requirements": {"group_size": 4, "activity_tags": []},
+                })
+                cookie = writer.cookies.get(LAST_WRITE_COOKIE)
+                # 同一 worker：只靠进程内记录
+                writer.cookies.clear()
+                seen["recent_writers"] = await history(writer, "writer")
+                # 其他 worker：只靠 cookie
+                recent_writers._written.clear()
+                writer.cookies.set(LAST_WRITE_COOKIE, cookie)
+                seen["cookie"] = await history(writer, "writer")
+                seen["other_user"] = await history(reader, "reader")
+            return sticky, separate, created, cookie, seen
+
+    sticky, separate, created, cookie, seen = asyncio.new_event_loop().run_until_complete(go())
+    assert sticky and separate
+    assert created.status_code == 200, created.text
+    assert cookie
+    new_id = created.json()["activity_id"]
+    assert seen["before_write"] == {"replica_writer"}
+    assert seen["recent_writers"] == {new_id}
+    assert seen["cookie"] == {new_id}
+    assert seen["other_user"] == {"replica_reader"}
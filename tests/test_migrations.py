@@ -0,0 +1,49 @@
+import time
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import insert, select
+from sqlmodel import SQLModel, create_engine
+from database.migrations import MIGRATIONS
+from schema.database import AdminActivityAction, Event
+
+
+@pytest.fixture
+def beijing_host(monkeypatch):
+    """服务器本地时区为东八区"""
+    monkeypatch.setenv("TZ", "Asia/Shanghai")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _event(activity_id: str, created_at: datetime, updated_at: datetime) -> dict:
+    return dict(
+        activity_id=activity_id, owner_id="u1", participants_id=["u1"], status="approved",
+        created_at=created_at, updated_at=updated_at, rating=None, rating_id=[],
+    )
+
+
+def test_normalize_timestamps_keeps_admin_written_updated_at(tmp_path, beijing_host):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    SQLModel.metadata.create_all(engine)
+    created = datetime(2024, 1, 1, 10, 0)
+    reviewed = datetime(2024, 1, 2, 4, 0)  # 审核接口写入的 utcnow()
+    edited = datetime(2024, 1, 3, 12, 0)  # /update 写入的本地时间
+    with engine.begin() as conn:
+        conn.execute(insert(Event.__table__), [
+            _event("reviewed", created, reviewed),
+            _event("edited", created, edited),
+        ])
+        conn.execute(insert(AdminActivityAction.__table__), [dict(
+            activity_id="reviewed", reviewer_id="admin", decision="approved", comment="", operated_at=reviewed,
+        )])
+
+    with engine.begin() as conn:
+        MIGRATIONS[2](conn)
+
+    table = Event.__table__
+    with engine.connect() as conn:
+        rows = dict(conn.execute(select(table.c.activity_id, table.c.updated_at)).all())
+    assert rows["reviewed"] == reviewed.replace(tzinfo=timezone.utc)
+    assert rows["edited"] == datetime(2024, 1, 3, 4, 0, tzinfo=timezone.utc)
@@ -0,0 +1,46 @@
+import asyncio
+from web.ratelimit import InMemoryBackend, RateLimitMiddleware, RateLimitRule
+
+
+def _statuses(middleware, scopes):
+    statuses = []
+
+    async def endpoint(scope, receive, send):
+        statuses.append(200)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    middleware.app = endpoint
+    loop = asyncio.new_event_loop()
+    for scope in scopes:
+        loop.run_until_complete(middleware(scope, None, send))
+    return statuses
+
+
+def _scope(user_id: str, ip: str) -> dict:
+    return {
+        "type": "http", "method": "POST", "path": "/api/activities/create",
+        "query_string": f"user_id={user_id}".encode(), "headers": [(b"x-user-id", user_id.encode())],
+        "client": (ip, 1),
+    }
+
+
+def test_changing_user_id_does_not_bypass_limit():
+    middleware = RateLimitMiddleware(None, rules=[RateLimitRule("POST", "/api/activities/create", 1 / 10, 3)])
+    middleware.enabled = True
+    statuses = _statuses(middleware, [_scope(f"user_{i}", "10.0.0.1") for i in range(5)])
+    assert statuses == [200, 200, 200, 429, 429]
+    # 其他客户端不受影响
+    assert _statuses(middleware, [_scope("user_0", "10.0.0.2")]) == [200]
+
+
+def test_eviction_uses_each_bucket_refill_time():
+    backend = InMemoryBackend()
+    slow = ("ip:10.0.0.1", "/api/activities/create")
+    for _ in range(3):
+        backend.acquire_sync(slow, rate=1 / 10, burst=3, now=0.0)
+    # 5 秒后新建补满只需 1 秒的桶，不能据此淘汰需要 30 秒补满的空桶
+    backend.acquire_sync(("ip:10.0.0.2", "/api/activities/history"), rate=5, burst=5, now=5.0)
+    assert backend.acquire_sync(slow, rate=1 / 10, burst=3, now=6.0) > 0
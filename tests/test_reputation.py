@@ -0,0 +1,52 @@
+import threading
+import time
+from sqlmodel import Session, SQLModel, create_engine
+from database.reputation import apply_partner_rating
+from schema.database import PartnerRating, UserReputation
+from schema.timeutil import utcnow
+
+
+def _rating(rating_id: str, tags) -> PartnerRating:
+    return PartnerRating(
+        rating_id=rating_id, status="submitted", submitted_at=utcnow(),
+        user_id="target", rater_id=rating_id, tags=tags, comment="",
+    )
+
+
+def test_concurrent_ratings_are_not_lost(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rep.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    SQLModel.metadata.create_all(engine)
+    first_applied = threading.Event()
+    errors = []
+
+    def first():
+        try:
+            with Session(engine) as session:
+                apply_partner_rating(session, _rating("r1", ["守时"]))
+                first_applied.set()
+                time.sleep(0.3)  # 第二个写入者在此期间读取聚合
+                session.commit()
+        except Exception as e:  # pragma: no cover - 失败时由断言报告
+            errors.append(e)
+            first_applied.set()
+
+    def second():
+        first_applied.wait()
+        try:
+            with Session(engine) as session:
+                apply_partner_rating(session, _rating("r2", ["守时", "健谈"]))
+                session.commit()
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with Session(engine) as session:
+        reputation = session.get(UserReputation, "target")
+        assert reputation.rating_count == 2
+        assert reputation.tag_histogram == {"守时": 2, "健谈": 1}
@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from web.testpage import STARTUP_BUDGET_MS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import web.testpage
+print(json.dumps({"import_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+
+def _import_ms() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", _SCRIPT],
+        cwd=ROOT, env=dict(os.environ), capture_output=True, text=True, check=True, timeout=60,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])["import_ms"]
+
+
+def test_worker_import_within_budget():
+    # 新进程导入，排除本进程已缓存的模块；取多次中的最小值降低机器抖动的影响
+    import_ms = min(_import_ms() for _ in range(3))
+    assert import_ms < STARTUP_BUDGET_MS, f"导入 web.testpage 耗时 {import_ms:.0f} ms，超出预算 {STARTUP_BUDGET_MS} ms"
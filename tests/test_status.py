@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from benchmarks.harness import bench_app
+from database.status import VersionConflict, changes_after, record_created, write_event
+from schema.database import Event
+from schema.timeutil import utcnow
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_status_writes_over_http():
+    async def go():
+        async with bench_app(events=10) as (app, client, data):
+            async def feed(after, limit=100):
+                params = {"after": after, "limit": limit, "user_id": "owner", "token": "t"}
+                return (await client.get("/api/activities/status-changes", params=params)).json()
+
+            # 先翻到变更流末尾
+            cursor = 0
+            while True:
+                page = await feed(cursor, 1000)
+                if not page["changes"]:
+                    break
+                cursor = page["next_after"]
+
+            created = await client.post("/api/activities/manual-create", json={
+                "user_id": "owner", "token": "t", "title": "夜跑", "description": "", "theme": "跑步",
+                "location": "奥森", "budget": 0, "start_time": "2031-02-01T20:00:00+08:00",
+                "requirements": {"group_size": 4, "activity_tags": []},
+            })
+            activity_id = created.json()["activity_id"]
+
+            def owner(status, version):
+                return client.put(f"/api/activities/{activity_id}/update", json={
+                    "user_id": "owner", "token": "t", "activity_id": activity_id, "status": status, "version": version,
+                })
+
+            def admin(status, version):
+                return client.post("/api/admin/activities/update", json={
+                    "user_id": "admin", "token": "t", "activity_id": activity_id, "status": status,
+                    "reviewer_id": "admin", "version": version,
+                })
+
+            results = {
+                "submit": await owner("pending", 0),
+                "stale": await owner("created", 0),
+                # 管理员与创建者读到同一版本，创建者已先写入
+                "admin_stale": await admin("approved", 0),
+                "approve": await admin("approved", 1),
+                "illegal": await owner("pending", 2),
+            }
+            first = await feed(cursor, 2)
+            second = await feed(first["next_after"], 2)
+            third = await feed(second["next_after"], 2)
+            return activity_id, results, [first, second, third]
+
+    activity_id, results, pages = _run(go())
+    assert results["submit"].json()["version"] == 1
+    assert results["stale"].status_code == 409
+    assert results["admin_stale"].status_code == 409
+    assert results["approve"].status_code == 200
+    assert results["approve"].json()["version"] == 2
+    assert results["illegal"].status_code == 409
+
+    changes = [change for page in pages for change in page["changes"]]
+    assert [(c["activity_id"], c["from_status"], c["to_status"], c["version"]) for c in changes] == [
+        (activity_id, None, "created", 0),
+        (activity_id, "created", "pending", 1),
+        (activity_id, "pending", "approved", 2),
+    ]
+    seqs = [c["seq"] for c in changes]
+    assert seqs == sorted(seqs)
+    assert pages[0]["next_after"] == seqs[1]
+    assert pages[1]["next_after"] == seqs[2]
+    # 读到末尾后游标不动
+    assert pages[2] == {"changes": [], "next_after": seqs[2]}
+
+
+def test_concurrent_write_with_same_read_version_loses(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'status.db'}")
+    SQLModel.metadata.create_all(engine)
+    now = utcnow()
+    with Session(engine) as session:
+        event = Event(
+            activity_id="a1", owner_id="owner", participants_id=["owner"], status="pending",
+            created_at=now, updated_at=now, rating=None, rating_id=[],
+        )
+        session.add(event)
+        record_created(session, event, "owner")
+        session.commit()
+
+    owner_session, admin_session = Session(engine), Session(engine)
+    owner_event = owner_session.get(Event, "a1")
+    admin_event = admin_session.get(Event, "a1")
+    assert owner_event.version == admin_event.version == 0
+
+    write_event(owner_session, owner_event, "owner", "owner", to_status="created")
+    owner_session.commit()
+    with pytest.raises(VersionConflict):
+        write_event(admin_session, admin_event, "admin", "admin", to_status="approved")
+    admin_session.rollback()
+    owner_session.close()
+    admin_session.close()
+
+    with Session(engine) as session:
+        event = session.get(Event, "a1")
+        assert (event.status, event.version) == ("created", 1)
+        log = changes_after(session, 0, 10)
+        assert [(e.from_status, e.to_status) for e in log] == [(None, "pending"), ("pending", "created")]
+        assert [e.seq for e in changes_after(session, log[0].seq, 10)] == [log[1].seq]
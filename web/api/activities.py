@@ -1,32 +1,47 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi.responses import Response
 from datetime import datetime, timezone, timedelta
 import uuid
-from database.lifetime import get_session, Event, EventContent
+from database.lifetime import get_read_session, get_session, read_engine, Event, EventContent
 router = APIRouter()
-from schema.activity import ActivityInputData, ActivityCreateRequest, GeneratedActivity, ActivityCreateResponse, ManualCreateRequest, ManualCreateResponse, ManualCreateRequirements, ActivityCardRequest, ActivityCardResponse, ActivityDetailRequest, ActivityDetailResponse, ActivityDetailRequirements, ActivityUpdateRequest, ActivityUpdateResponse, ActivityUpdateRequirements, ActivityFeedbackRequest, ActivityFeedbackResponse, FeedbackListResponse, FeedbackItem, ActivityHistoryItem, ActivityHistoryRequest, ActivityHistoryResponse
+from schema.activity import ActivityInputData, ActivityCreateRequest, GeneratedActivity, ActivityCreateResponse, ManualCreateRequest, ManualCreateResponse, ManualCreateRequirements, ActivityCardRequest, ActivityCardResponse, ActivityDetailRequest, ActivityDetailResponse, ActivityBatchDetailRequest, ActivityBatchDetailResponse, ActivityDetailRequirements, ActivityUpdateRequest, ActivityUpdateResponse, ActivityUpdateRequirements, ActivityFeedbackRequest, ActivityFeedbackResponse, FeedbackListResponse, FeedbackItem, ActivityHistoryItem, ActivityHistoryRequest, ActivityHistoryResponse, LeaderboardItem, LeaderboardResponse, StatusChangeItem, StatusChangeFeedResponse
 from schema.database import EventRating
 from typing import List
 from fastapi import Query
-from dateutil import parser
 import random
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from database.singleflight import activity_reads
+from schema.timeutil import parse_iso8601, utcnow
+from database import schedule
+from database.leaderboard import KINDS, leaderboards, refresh_activity, trending_velocity
+from database.archive import load_archived, load_archived_history, load_archived_many, load_archived_ratings
+from web import cards
+from database.status import OWNER_STATUSES, InvalidTransition, VersionConflict, changes_after, record_created, write_event
+
+# 批量详情单次最多的活动数
+MAX_BATCH_DETAILS = 100
+
 
 @router.post("/api/activities/create", response_model=ActivityCreateResponse)
-async def create_activity(request: Request, body: ActivityCreateRequest):
+async def create_activity(request: Request, body: ActivityCreateRequest, background_tasks: BackgroundTasks):
     # 1. 过滤和处理输入
     input_data = body.input_data
 
     # 2. 生成活动内容（此处为模拟，实际可接入AI/模板生成）
     # 生成活动ID和时间
     activity_id = f"a{uuid.uuid4().hex[:6]}"
-    now = datetime.now(timezone(timedelta(hours=8)))  # 东八区
-    start_time = now.replace(hour=9, minute=0, second=0, microsecond=0)
+    now = utcnow()
+    # 客户端未指定时间，以东八区当天上午 9 点占位，统一以 UTC 存储
+    start_time = schedule.placeholder_start(now)
     # 简单生成标题和描述
     title = f"{input_data.location}{input_data.theme}之旅"
     description = f"本次活动结合{input_data.location}的自然景观，为摄影爱好者提供捕捉秋日光影的机会。"
     recommended_equipment = ["单反相机", "三脚架"]
 
     # 3. 写入数据库
-    session = get_session(request)
+    session = get_session(request, body.user_id)
+    # 占位时间不占用日程、不做冲突检查；/update 设置时间后才写入日程
     try:
         # 主表
         event = Event(
@@ -40,6 +55,7 @@ async def create_activity(request: Request, body: ActivityCreateRequest):
             rating_id=[]
         )
         session.add(event)
+        record_created(session, event, body.user_id)
         # 内容表
         event_content = EventContent(
             activity_id=activity_id,
@@ -59,6 +75,8 @@ async def create_activity(request: Request, body: ActivityCreateRequest):
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"活动创建失败: {str(e)}")
+    # 预渲染分享卡片
+    cards.schedule_refresh(background_tasks, request.app.state.engine, activity_id)
 
     # 4. 返回响应
     return ActivityCreateResponse(
@@ -75,18 +93,23 @@ async def create_activity(request: Request, body: ActivityCreateRequest):
 
 
 @router.post("/api/activities/manual-create", response_model=ManualCreateResponse)
-async def manual_create_activity(request: Request, body: ManualCreateRequest):
+async def manual_create_activity(request: Request, body: ManualCreateRequest, background_tasks: BackgroundTasks):
 
 
     activity_id = f"a{uuid.uuid4()}"
-    now = datetime.now()
-    start_time = parser.parse(body.start_time)
+    now = utcnow()
+    try:
+        start_time = parse_iso8601(body.start_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
    #title = AI.genete_title(body.title, body.description, body.theme, body.location)
 
 
-    session = get_session(request)
+    session = get_session(request, body.user_id)
+    interval = schedule.activity_interval(start_time, None)
+    _ensure_no_conflict(session, body.user_id, *interval)
     try:
         # 主表
         event = Event(
@@ -100,6 +123,7 @@ async def manual_create_activity(request: Request, body: ManualCreateRequest):
             rating_id=[]
         )
         session.add(event)
+        record_created(session, event, body.user_id)
         # 内容表
         event_content = EventContent(
             activity_id=activity_id,
@@ -115,10 +139,14 @@ async def manual_create_activity(request: Request, body: ManualCreateRequest):
             activity_tags=body.requirements.activity_tags
         )
         session.add(event_content)
+        schedule.add_activity(session, activity_id, [body.user_id], *interval)
         session.commit()
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"活动创建失败: {str(e)}")
+    schedule.schedule_index.add([body.user_id], *interval, activity_id)
+    # 预渲染分享卡片
+    cards.schedule_refresh(background_tasks, request.app.state.engine, activity_id)
 
     return ManualCreateResponse(
         activity_id=activity_id,
@@ -127,37 +155,15 @@ async def manual_create_activity(request: Request, body: ManualCreateRequest):
     )
 
 
-@router.post("/api/activities/{activity_id}/generate-card", response_model=ActivityCardResponse)
-async def generate_activity_card(
-    activity_id: str,
-    body: ActivityCardRequest,
-    request: Request
-):
-    session = get_session(request)
-    event_content = session.query(EventContent).filter_by(activity_id=activity_id).first()
-    if not event_content:
-        raise HTTPException(status_code=404, detail="活动不存在")
-    return ActivityCardResponse(
-        activity_id=activity_id,
-        title=event_content.title,
-        location=event_content.location,
-        start_time=event_content.start_time.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
-    )
+def _ensure_no_conflict(session, user_id: str, start, end, exclude: str = None) -> None:
+    """与用户已有活动时间重叠时返回 409"""
+    conflicts = schedule.find_conflicts(session, user_id, start, end, exclude=exclude)
+    if conflicts:
+        raise HTTPException(status_code=409, detail=f"与已有活动时间冲突: {', '.join(conflicts)}")
 
-@router.get("/api/activities/{activity_id}/details", response_model=ActivityDetailResponse)
-async def get_activity_detail(
-    activity_id: str,
-    user_id: str = Query(...),
-    token: str = Query(...),
-    request: Request = None
-):  
-    print(f"Fetching details for activity_id: {activity_id}, user_id: {user_id}, token: {token}")
-    session = get_session(request)
-    event = session.query(Event).filter_by(activity_id=activity_id).first()
-    event_content = session.query(EventContent).filter_by(activity_id=activity_id).first()
-    if not event or not event_content:
-        raise HTTPException(status_code=404, detail="活动不存在")
 
+def _build_activity_detail(event, event_content) -> ActivityDetailResponse:
+    """由 Event / EventContent 组装详情响应"""
     # 组装 requirements
     requirements = ActivityDetailRequirements(
         group_size=str(event_content.group_size) if hasattr(event_content, "group_size") else "",
@@ -166,7 +172,7 @@ async def get_activity_detail(
     )
 
     return ActivityDetailResponse(
-        activity_id=activity_id,
+        activity_id=event.activity_id,
         title=event_content.title,
         description=event_content.description,
         theme=event_content.theme,
@@ -178,21 +184,157 @@ async def get_activity_detail(
         requirements=requirements,
         participants=event.participants_id if hasattr(event, "participants_id") else [],
         created_at=event.created_at.strftime("%Y-%m-%dT%H:%M:%SZ") if event.created_at else "",
-        last_updated=event.updated_at.strftime("%Y-%m-%dT%H:%M:%SZ") if event.updated_at else ""
+        last_updated=event.updated_at.strftime("%Y-%m-%dT%H:%M:%SZ") if event.updated_at else "",
+        version=event.version or 0
+    )
+
+
+def _load_activity_detail(engine, activity_id: str):
+    """在线程池中查询活动详情，活动不存在返回 None"""
+    with Session(engine) as session:
+        event = session.query(Event).filter_by(activity_id=activity_id).first()
+        event_content = session.query(EventContent).filter_by(activity_id=activity_id).first()
+        if not event:
+            # 热表未命中时回查归档
+            event, event_content = load_archived(session.connection(), activity_id)
+        if not event or not event_content:
+            return None
+        return _build_activity_detail(event, event_content)
+
+
+def _load_activity_details(engine, activity_ids: List[str]):
+    """
+    在线程池中批量查询活动详情：event JOIN event_content 一次 IN 查询
+
+    :return: {activity_id: ActivityDetailResponse}，不存在的 ID 不在结果中
+    """
+    found = {}
+    with Session(engine) as session:
+        rows = session.query(Event, EventContent).join(
+            EventContent, EventContent.activity_id == Event.activity_id
+        ).filter(Event.activity_id.in_(activity_ids)).all()
+        for event, event_content in rows:
+            if event.activity_id not in found:
+                found[event.activity_id] = _build_activity_detail(event, event_content)
+        missing = [activity_id for activity_id in activity_ids if activity_id not in found]
+        if missing:
+            # 热表未命中的部分回查归档
+            for activity_id, (event, event_content) in load_archived_many(session.connection(), missing).items():
+                found[activity_id] = _build_activity_detail(event, event_content)
+    return found
+
+
+async def _card_response(request: Request, background_tasks: BackgroundTasks, activity_id: str, fmt: str, user_id: str = None) -> Response:
+    """返回预渲染的卡片字节；If-None-Match 命中时返回 304"""
+    engine = read_engine(request, user_id)
+    card, needs_store = await activity_reads.do(
+        ("card", activity_id, engine),
+        lambda: run_in_threadpool(cards.load_card, engine, activity_id)
+    )
+    if card is None:
+        raise HTTPException(status_code=404, detail="活动不存在")
+    if needs_store:
+        # 缓存缺失：本次即时渲染，回写放到响应之后
+        cards.schedule_refresh(background_tasks, request.app.state.engine, activity_id)
+    body, etag = cards.payload(card, fmt)
+    headers = {"ETag": etag, "Cache-Control": cards.CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=cards.FORMATS[fmt], headers=headers)
+
+
+@router.post("/api/activities/{activity_id}/generate-card", response_model=ActivityCardResponse)
+async def generate_activity_card(
+    activity_id: str,
+    body: ActivityCardRequest,
+    request: Request,
+    background_tasks: BackgroundTasks
+):
+    return await _card_response(request, background_tasks, activity_id, "json", body.user_id)
+
+
+@router.get("/api/activities/{activity_id}/card.{fmt}")
+async def get_activity_card(
+    activity_id: str,
+    fmt: str,
+    request: Request,
+    background_tasks: BackgroundTasks
+):
+    """分享卡片（json / html / svg），分享链接无需登录"""
+    if fmt not in cards.FORMATS:
+        raise HTTPException(status_code=404, detail="不支持的卡片格式")
+    return await _card_response(request, background_tasks, activity_id, fmt)
+
+@router.get("/api/activities/{activity_id}/details", response_model=ActivityDetailResponse)
+async def get_activity_detail(
+    activity_id: str,
+    user_id: str = Query(...),
+    token: str = Query(...),
+    request: Request = None
+):  
+    print(f"Fetching details for activity_id: {activity_id}, user_id: {user_id}, token: {token}")
+    engine = read_engine(request, user_id)
+    detail = await activity_reads.do(
+        ("detail", activity_id, engine),
+        lambda: run_in_threadpool(_load_activity_detail, engine, activity_id)
+    )
+    if detail is None:
+        raise HTTPException(status_code=404, detail="活动不存在")
+    return detail
+
+@router.post("/api/activities/batch-details", response_model=ActivityBatchDetailResponse)
+async def get_activity_details_batch(
+    body: ActivityBatchDetailRequest,
+    request: Request
+):
+    activity_ids = list(dict.fromkeys(body.activity_ids))
+    if len(activity_ids) > MAX_BATCH_DETAILS:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {MAX_BATCH_DETAILS} 个活动")
+
+    engine = read_engine(request, body.user_id)
+    # 同一信息流的并发请求合并为一次查询
+    found = await activity_reads.do(
+        ("details", tuple(activity_ids), engine),
+        lambda: run_in_threadpool(_load_activity_details, engine, activity_ids)
+    )
+    return ActivityBatchDetailResponse(
+        items=[found[activity_id] for activity_id in activity_ids if activity_id in found],
+        missing=[activity_id for activity_id in activity_ids if activity_id not in found]
     )
 
 @router.put("/api/activities/{activity_id}/update", response_model=ActivityUpdateResponse)
 async def update_activity(
     activity_id: str,
     body: ActivityUpdateRequest,
-    request: Request
+    request: Request,
+    background_tasks: BackgroundTasks
 ):
-    session = get_session(request)
+    session = get_session(request, body.user_id)
     event = session.query(Event).filter_by(activity_id=activity_id).first()
     event_content = session.query(EventContent).filter_by(activity_id=activity_id).first()
     if not event or not event_content:
         raise HTTPException(status_code=404, detail="活动不存在")
 
+    start_time = None
+    if body.start_time:
+        try:
+            start_time = parse_iso8601(body.start_time)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if body.status and body.status not in OWNER_STATUSES:
+        raise HTTPException(status_code=400, detail="无效的状态")
+
+    # 时间变化时检查创建者的日程冲突
+    interval = None
+    if start_time or body.duration is not None:
+        interval = schedule.activity_interval(
+            start_time or event_content.start_time,
+            body.duration if body.duration is not None else event_content.duration
+        )
+        _ensure_no_conflict(session, event.owner_id, *interval, exclude=activity_id)
+
+    rescheduled = []
     try:
         # 更新主表
         if body.activity_title:
@@ -205,8 +347,8 @@ async def update_activity(
             event_content.location = body.location
         if body.budget is not None:
             event_content.budget = body.budget
-        if body.start_time:
-            event_content.start_time = parser.parse(body.start_time)
+        if start_time:
+            event_content.start_time = start_time
         if body.duration is not None:
             event_content.duration = body.duration
         if body.requirements:
@@ -214,25 +356,37 @@ async def update_activity(
                 event_content.group_size = body.requirements.group_size
             if body.requirements.activity_tags is not None:
                 event_content.activity_tags = body.requirements.activity_tags
-        if body.status:
-            if body.status not in ["created", "pending"]:
-                raise HTTPException(status_code=400, detail="无效的状态")
-            event.status = body.status # 更新状态
-                
-        # 更新时间
-        now = datetime.now()
-        event.updated_at = now
+        # 以读取时的版本为条件写入（同时更新时间），状态变化记入日志
+        write_event(session, event, body.user_id, "owner", to_status=body.status, expected_version=body.version)
+
+        if interval and event.status not in schedule.INACTIVE_STATUSES:
+            rescheduled = schedule.reschedule_activity(
+                session, activity_id, *interval, members=[event.owner_id, *(event.participants_id or [])]
+            )
 
         session.commit()
         feedback = "success"
+    except (InvalidTransition, VersionConflict) as e:
+        session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         session.rollback()
         feedback = "fail"
+    else:
+        if rescheduled:
+            schedule.schedule_index.remove(rescheduled, activity_id)
+            schedule.schedule_index.add(rescheduled, *interval, activity_id)
+        if body.status or body.activity_title or body.theme or body.location:
+            refresh_activity(session, activity_id)
+        if body.activity_title or body.location or start_time:
+            # 卡片展示的字段变化，响应后重新渲染
+            cards.schedule_refresh(background_tasks, request.app.state.engine, activity_id)
 
     return ActivityUpdateResponse(
         activity_id=activity_id,
         feedback=feedback,
-        updated_at=event.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f%z") if event.updated_at else ""
+        updated_at=event.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f%z") if event.updated_at else "",
+        version=event.version or 0
     )
 
 @router.post("/api/activities/{activity_id}/feedback", response_model=ActivityFeedbackResponse)
@@ -241,10 +395,7 @@ async def submit_activity_feedback(
     body: ActivityFeedbackRequest,
     request: Request
 ):
-    from datetime import datetime
-    import random
-
-    session = get_session(request)
+    session = get_session(request, body.user_id)
     event = session.query(Event).filter_by(activity_id=activity_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="活动不存在")
@@ -256,7 +407,7 @@ async def submit_activity_feedback(
     # 生成唯一 rating_id
     rating_id = f"f{random.getrandbits(16):04x}"
 
-    now = datetime.now()
+    now = utcnow()
     # 写入 EventRating
 
     event_rating = EventRating(
@@ -277,7 +428,16 @@ async def submit_activity_feedback(
         event.rating = avg_rating
     else:
         event.rating = body.rating
-    session.commit()
+    event_content = session.query(EventContent).filter_by(activity_id=activity_id).first()
+    # 提交后仍用已加载的数据刷新榜单，不因过期而逐行重新加载
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"评价提交失败: {str(e)}")
+    # 只有提交成功的评价才进入榜单
+    leaderboards.update(event, event_content, all_ratings)
 
     return ActivityFeedbackResponse(
         activity_id=activity_id,
@@ -294,8 +454,10 @@ async def get_activity_feedback_list(
     token: str = Query(...),
     request: Request = None
 ):
-    session = get_session(request)
+    session = get_read_session(request, user_id)
     feedbacks = session.query(EventRating).filter_by(activity_id=activity_id).all()
+    if not feedbacks and not session.get(Event, activity_id):
+        feedbacks = load_archived_ratings(session.connection(), activity_id)
     feedback_items = [
         FeedbackItem(
             feedback_id=f.rating_id,
@@ -317,7 +479,7 @@ async def get_user_activity_history(
     token: str = Query(...),
     request: Request = None
 ):
-    session = get_session(request)
+    session = get_read_session(request, user_id)
 
     # 只保留非 cancelled 和 rejected 的活动
     valid_status = ["created", "pending", "approved", "finished"]
@@ -351,7 +513,82 @@ async def get_user_activity_history(
         for e in joined_events
     ]
 
+    # 已归档的活动（超过保留期的终态活动）
+    archived_history = [
+        ActivityHistoryItem(
+            activity_id=e.activity_id,
+            status="created" if e.owner_id == user_id else "joined",
+            timestamp=e.created_at.strftime("%Y-%m-%dT%H:%M:%SZ") if e.created_at else ""
+        )
+        for e in load_archived_history(session.connection(), user_id, valid_status)
+    ]
+
     return ActivityHistoryResponse(
         user_id=user_id,
-        history=created_history + joined_history
-    )
\ No newline at end of file
+        history=created_history + joined_history + archived_history
+    )
+
+
+@router.get("/api/activities/leaderboard", response_model=LeaderboardResponse)
+async def get_activity_leaderboard(
+    kind: str = Query("top_rated"),
+    theme: str = Query(None),
+    location: str = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    user_id: str = Query(...),
+    token: str = Query(...)
+):
+    if kind not in KINDS:
+        raise HTTPException(status_code=400, detail="无效的榜单类型")
+    if theme and location:
+        raise HTTPException(status_code=400, detail="theme 与 location 只能指定一个")
+    scope, scope_value = ("theme", theme) if theme else ("location", location) if location else ("all", None)
+
+    now = utcnow()
+    items = leaderboards.top(kind, scope, scope_value, limit)
+    return LeaderboardResponse(
+        kind=kind,
+        scope=scope,
+        scope_value=scope_value,
+        items=[
+            LeaderboardItem(
+                activity_id=item["activity_id"],
+                title=item["title"],
+                theme=item["theme"],
+                location=item["location"],
+                rating=item["rating"],
+                rating_count=item["rating_count"],
+                trending_score=round(trending_velocity(item["trending_key"], now), 4) if item["trending_key"] is not None else 0.0
+            )
+            for item in items
+        ]
+    )
+
+
+@router.get("/api/activities/status-changes", response_model=StatusChangeFeedResponse)
+async def get_status_changes(
+    request: Request,
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    user_id: str = Query(...),
+    token: str = Query(...)
+):
+    """状态变更流：按 seq 增量拉取，下次以 next_after 作为 after"""
+    session = get_read_session(request, user_id)
+    entries = changes_after(session, after, limit)
+    return StatusChangeFeedResponse(
+        changes=[
+            StatusChangeItem(
+                seq=entry.seq,
+                activity_id=entry.activity_id,
+                from_status=entry.from_status,
+                to_status=entry.to_status,
+                version=entry.version,
+                actor_id=entry.actor_id,
+                source=entry.source,
+                changed_at=entry.changed_at.strftime("%Y-%m-%dT%H:%M:%S.%f%z") if entry.changed_at else ""
+            )
+            for entry in entries
+        ],
+        next_after=entries[-1].seq if entries else after
+    )
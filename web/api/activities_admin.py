@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime
-from database.lifetime import get_session, Event
+from schema.timeutil import utcnow
+from database.lifetime import get_read_session, get_session, Event
 router = APIRouter()
 from schema.activity_admin import PendingActivitiesResponse, PendingActivityItem, AdminActivityUpdateRequest, AdminActivityUpdateResponse
 from schema.database import Event, AdminActivityAction
 from fastapi import Query
+from database import schedule
+from database.leaderboard import refresh_activity
+from database.status import ADMIN_STATUSES, InvalidTransition, VersionConflict, normalize_status, write_event
 
 
 from schema.activity_admin import PendingActivitiesResponse, PendingActivityItem
@@ -15,7 +19,7 @@ async def get_pending_activities(
     user_id: str = Query(...),
     token: str = Query(...)
 ):
-    session = get_session(request)
+    session = get_read_session(request, user_id)
     # 查询所有待审核活动
     pending_events = session.query(Event).filter_by(status="pending").all()
     pending_activities = []
@@ -37,35 +41,49 @@ async def admin_update_activity(
     body: AdminActivityUpdateRequest,
     request: Request
 ):
-    session = get_session(request)
+    session = get_session(request, body.user_id)
     event = session.query(Event).filter_by(activity_id=body.activity_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="活动不存在")
 
 
-    now = datetime.utcnow()
+    decision = normalize_status(body.status)
+    if decision not in ADMIN_STATUSES:
+        raise HTTPException(status_code=400, detail="无效的审核结果")
+
+    now = utcnow()
     try:
-        # 只更新event中的status
-        event.status = body.status
-        event.updated_at = now
+        # 按状态机校验并以版本为条件更新 status，变更记入状态日志
+        write_event(session, event, body.reviewer_id, "admin", to_status=decision, expected_version=body.version, now=now)
 
         # 新增一条AdminActivityAction记录
         admin_action = AdminActivityAction(
             activity_id=body.activity_id,
             reviewer_id=body.reviewer_id,
-            decision=body.status,
+            decision=decision,
             comment=body.comment,
             operated_at=now
         )
         session.add(admin_action)
 
+        # 驳回/取消后不再占用成员日程
+        released = []
+        if decision in schedule.INACTIVE_STATUSES:
+            released = schedule.remove_activity(session, body.activity_id)
+
         session.commit()
+    except (InvalidTransition, VersionConflict) as e:
+        session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"审核失败: {str(e)}")
+    schedule.schedule_index.remove(released, body.activity_id)
+    refresh_activity(session, body.activity_id)
 
     return AdminActivityUpdateResponse(
         activity_id=body.activity_id,
-        new_status=body.status,
-        reviewed_at=now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        new_status=decision,
+        reviewed_at=now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        version=event.version
     )
\ No newline at end of file
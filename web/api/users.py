@@ -0,0 +1,156 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi import Query
+import uuid
+from database.lifetime import get_read_session, get_session
+from database.reputation import apply_partner_rating, current_score, get_reputations
+from database.schedule import calendar, free_slots
+from schema.database import PartnerRating, UserReputation
+from schema.reputation import PartnerRatingRequest, PartnerRatingResponse, ReputationResponse, ReputationBatchRequest, ReputationBatchResponse
+from schema.schedule import CalendarItem, CalendarResponse, FreeSlot, FreeSlotsRequest, FreeSlotsResponse
+from schema.timeutil import parse_iso8601, utcnow
+router = APIRouter()
+
+# 批量查询单次最多的用户数
+MAX_BATCH_USERS = 200
+
+# 日历 / 空闲时段查询的最大窗口
+MAX_WINDOW_DAYS = 366
+
+
+def _reputation_response(user_id: str, reputation: UserReputation, now) -> ReputationResponse:
+    """聚合行 -> 响应；没有任何评价的用户返回零值"""
+    if reputation is None:
+        return ReputationResponse(user_id=user_id, rating_count=0, tag_histogram={}, score=0.0, last_rated_at="")
+    return ReputationResponse(
+        user_id=user_id,
+        rating_count=reputation.rating_count,
+        tag_histogram=reputation.tag_histogram or {},
+        score=round(current_score(reputation, now), 4),
+        last_rated_at=reputation.last_rated_at.strftime("%Y-%m-%dT%H:%M:%SZ") if reputation.last_rated_at else ""
+    )
+
+
+@router.post("/api/users/{user_id}/partner-ratings", response_model=PartnerRatingResponse)
+async def submit_partner_rating(
+    user_id: str,
+    body: PartnerRatingRequest,
+    request: Request
+):
+    if body.user_id == user_id:
+        raise HTTPException(status_code=400, detail="不能评价自己")
+
+    session = get_session(request, body.user_id)
+    now = utcnow()
+    rating = PartnerRating(
+        rating_id=f"p{uuid.uuid4().hex}",
+        status="submitted",
+        submitted_at=now,
+        user_id=user_id,
+        rater_id=body.user_id,
+        tags=body.tags,
+        comment=body.comment
+    )
+    try:
+        session.add(rating)
+        # 与评价同一事务更新预聚合
+        apply_partner_rating(session, rating)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"评价提交失败: {str(e)}")
+
+    return PartnerRatingResponse(
+        rating_id=rating.rating_id,
+        user_id=user_id,
+        status="submitted",
+        submitted_at=now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    )
+
+
+@router.get("/api/users/{user_id}/reputation", response_model=ReputationResponse)
+async def get_user_reputation(
+    user_id: str,
+    token: str = Query(...),
+    request: Request = None
+):
+    session = get_read_session(request)
+    reputation = session.get(UserReputation, user_id)
+    return _reputation_response(user_id, reputation, utcnow())
+
+
+@router.post("/api/users/reputation/batch", response_model=ReputationBatchResponse)
+async def get_user_reputation_batch(
+    body: ReputationBatchRequest,
+    request: Request
+):
+    if len(body.user_ids) > MAX_BATCH_USERS:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {MAX_BATCH_USERS} 个用户")
+
+    session = get_read_session(request, body.user_id)
+    reputations = get_reputations(session, body.user_ids)
+    now = utcnow()
+    return ReputationBatchResponse(
+        reputations=[
+            _reputation_response(user_id, reputations.get(user_id), now)
+            for user_id in dict.fromkeys(body.user_ids)
+        ]
+    )
+
+
+def _parse_window(start: str, end: str):
+    """解析查询窗口，格式错误或窗口过大返回 400"""
+    try:
+        window_start, window_end = parse_iso8601(start), parse_iso8601(end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if window_end <= window_start:
+        raise HTTPException(status_code=400, detail="结束时间必须晚于开始时间")
+    if (window_end - window_start).days > MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"查询窗口不能超过 {MAX_WINDOW_DAYS} 天")
+    return window_start, window_end
+
+
+@router.get("/api/users/{user_id}/calendar", response_model=CalendarResponse)
+async def get_user_calendar(
+    user_id: str,
+    from_: str = Query(..., alias="from"),
+    to: str = Query(...),
+    token: str = Query(...),
+    request: Request = None
+):
+    window_start, window_end = _parse_window(from_, to)
+    # 日程索引同时服务写入时的冲突检测，从主库加载，避免副本延迟的数据进入缓存
+    session = get_session(request)
+    items = calendar(session, user_id, window_start, window_end)
+    return CalendarResponse(
+        user_id=user_id,
+        items=[
+            CalendarItem(
+                activity_id=activity_id,
+                start_time=start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                end_time=end.strftime("%Y-%m-%dT%H:%M:%SZ")
+            )
+            for activity_id, start, end in items
+        ]
+    )
+
+
+@router.post("/api/users/free-slots", response_model=FreeSlotsResponse)
+async def get_group_free_slots(
+    body: FreeSlotsRequest,
+    request: Request
+):
+    if len(body.user_ids) > MAX_BATCH_USERS:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {MAX_BATCH_USERS} 个用户")
+    window_start, window_end = _parse_window(body.start_time, body.end_time)
+
+    # 日程索引同时服务写入时的冲突检测，从主库加载，避免副本延迟的数据进入缓存
+    session = get_session(request)
+    slots = free_slots(session, body.user_ids, window_start, window_end, body.min_duration)
+    return FreeSlotsResponse(
+        user_ids=body.user_ids,
+        slots=[
+            FreeSlot(start_time=start.strftime("%Y-%m-%dT%H:%M:%SZ"), end_time=end.strftime("%Y-%m-%dT%H:%M:%SZ"))
+            for start, end in slots
+        ]
+    )
@@ -0,0 +1,165 @@
+import hashlib
+import json
+from datetime import timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Set, Tuple
+from loguru import logger
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from database.archive import load_archived
+from schema.database import ActivityCard, EventContent
+from schema.timeutil import utcnow
+
+# 模板或渲染逻辑变化时加一，旧版本的缓存在下次读取时重新渲染
+CARD_TEMPLATE_VERSION = 1
+
+# 格式 -> Content-Type
+FORMATS = {
+    "json": "application/json",
+    "html": "text/html; charset=utf-8",
+    "svg": "image/svg+xml",
+}
+
+# 分享链接会被聊天工具/浏览器反复拉取；内容变化后靠 ETag 重新验证
+CACHE_CONTROL = "public, max-age=60"
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+_DISPLAY_TZ = timezone(timedelta(hours=8))
+_TITLE_MAX = 18  # 分享图标题最多显示的字数
+
+# 已提交、尚未开始执行的重渲染任务
+_pending: Set[str] = set()
+
+
+@lru_cache(maxsize=1)
+def _environment():
+    """首次渲染卡片时才加载 Jinja2"""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    return Environment(
+        loader=FileSystemLoader(str(TEMPLATE_DIR)),
+        autoescape=select_autoescape(["html", "svg"]),
+        trim_blocks=True,
+    )
+
+
+def render_card(activity_id: str, content) -> ActivityCard:
+    """
+    由活动内容渲染全部格式的卡片
+
+    :param content: EventContent 或归档的 content 行
+    """
+    start_time = content.start_time
+    card = dict(
+        activity_id=activity_id,
+        title=content.title,
+        location=content.location,
+        start_time=start_time.strftime("%Y-%m-%dT%H:%M:%S.%f%z") if start_time else "",
+    )
+    context = dict(
+        card,
+        title_short=content.title if len(content.title) <= _TITLE_MAX else content.title[:_TITLE_MAX] + "…",
+        start_display=start_time.astimezone(_DISPLAY_TZ).strftime("%Y-%m-%d %H:%M") if start_time else "",
+    )
+    env = _environment()
+    json_payload = json.dumps(card, ensure_ascii=False, separators=(",", ":"))
+    html_payload = env.get_template("card.html").render(context)
+    svg_payload = env.get_template("card.svg").render(context)
+
+    digest = hashlib.sha1()
+    for part in (str(CARD_TEMPLATE_VERSION), json_payload, html_payload, svg_payload):
+        digest.update(part.encode("utf-8"))
+    return ActivityCard(
+        activity_id=activity_id,
+        etag=digest.hexdigest()[:20],
+        template_version=CARD_TEMPLATE_VERSION,
+        json_payload=json_payload,
+        html_payload=html_payload,
+        svg_payload=svg_payload,
+        rendered_at=utcnow(),
+    )
+
+
+def payload(card: ActivityCard, fmt: str) -> Tuple[bytes, str]:
+    """:return: (响应体, ETag)"""
+    body = getattr(card, f"{fmt}_payload").encode("utf-8")
+    return body, f'"{card.etag}-{fmt}"'
+
+
+def load_card(engine: Engine, activity_id: str) -> Tuple[Optional[ActivityCard], bool]:
+    """
+    读取卡片缓存（在线程池中执行）
+
+    缓存缺失或模板版本过期时按当前内容即时渲染，由调用方决定是否回写。
+
+    :return: (卡片, 是否需要回写)；活动不存在时为 (None, False)
+    """
+    with Session(engine) as session:
+        card = session.get(ActivityCard, activity_id)
+        if card is not None and card.template_version == CARD_TEMPLATE_VERSION:
+            return card, False
+        content = session.query(EventContent).filter_by(activity_id=activity_id).first()
+        if content is not None:
+            return render_card(activity_id, content), True
+        # 归档活动只渲染不缓存
+        _, content = load_archived(session.connection(), activity_id)
+        if content is None:
+            return None, False
+        return render_card(activity_id, content), False
+
+
+def refresh_card(engine: Engine, activity_id: str) -> None:
+    """
+    按主库中的最新内容重新渲染并保存卡片（后台任务，写连接池）
+
+    活动已不存在时删除缓存。
+    """
+    try:
+        with Session(engine) as session:
+            content = session.query(EventContent).filter_by(activity_id=activity_id).first()
+            if content is None:
+                card = session.get(ActivityCard, activity_id)
+                if card is not None:
+                    session.delete(card)
+            else:
+                session.merge(render_card(activity_id, content))
+            session.commit()
+    except Exception as e:
+        logger.error(f"Card render failed for {activity_id}: {e}")
+
+
+def schedule_refresh(background_tasks, engine: Engine, activity_id: str) -> None:
+    """
+    响应发送后在后台重渲染卡片；同一活动已有待执行的任务时不重复提交
+
+    :param background_tasks: 当前请求的 BackgroundTasks
+    """
+    if activity_id in _pending:
+        return
+    _pending.add(activity_id)
+    background_tasks.add_task(_run_refresh, engine, activity_id)
+
+
+def _run_refresh(engine: Engine, activity_id: str) -> None:
+    # 开始执行即移出，执行期间的新修改会再提交一次
+    _pending.discard(activity_id)
+    refresh_card(engine, activity_id)
+
+
+# 渲染基准：python -m web.cards
+if __name__ == "__main__":
+    import timeit
+    from datetime import datetime
+
+    content = EventContent(
+        activity_id="a000001", title="周末西山徒步 <摄影>", description="", theme="徒步", location="西山森林公园",
+        start_time=datetime(2030, 1, 1, 2, tzinfo=timezone.utc), duration=3.0, budget=100, group_size=8,
+        recommended_equipment=[], activity_tags=[],
+    )
+    card = render_card("a000001", content)
+    number = 2000
+    render_us = timeit.timeit(lambda: render_card("a000001", content), number=number) / number * 1e6
+    serve_us = timeit.timeit(lambda: payload(card, "html"), number=number) / number * 1e6
+    logger.info(f"渲染全部格式: {render_us:.1f} µs/次")
+    logger.info(f"读取已渲染字节: {serve_us:.2f} µs/次")
+    logger.info(f"html:\n{card.html_payload}")
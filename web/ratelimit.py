@@ -0,0 +1,232 @@
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# 设为 1 时关闭限流（压测、本地调试）
+RATELIMIT_DISABLED_ENV = "MATE_RATELIMIT_DISABLED"
+# 配置后多个 worker 通过 Redis 共享令牌桶
+RATELIMIT_REDIS_ENV = "MATE_RATELIMIT_REDIS_URL"
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    method: str
+    path: str  # 路由模板，例如 "/api/activities/{activity_id}/feedback"
+    rate: float  # 每秒补充的令牌数
+    burst: int  # 桶容量（允许的突发请求数）
+
+
+# 默认限流规则：按 (客户端 IP, 路由) 计桶
+DEFAULT_RULES = [
+    RateLimitRule("POST", "/api/activities/create", rate=1 / 10, burst=3),  # 调用生成器，代价最高
+    RateLimitRule("POST", "/api/activities/manual-create", rate=1 / 2, burst=5),
+    RateLimitRule("POST", "/api/activities/{activity_id}/feedback", rate=1 / 5, burst=5),
+    RateLimitRule("GET", "/api/activities/{activity_id}/feedback_list", rate=5, burst=20),  # 未分页
+    RateLimitRule("GET", "/api/activities/history", rate=2, burst=10),  # 未分页
+    RateLimitRule("GET", "/api/admin/activities/pending", rate=2, burst=10),  # 未分页
+]
+
+
+class InMemoryBackend:
+    """
+    进程内令牌桶，单次检查 O(1)
+
+    按最近使用顺序保存桶 [令牌数, 上次使用时间, 补满所需秒数]；已闲置到补满的桶与新建桶等价，
+    优先淘汰，总数超过 max_keys 时再淘汰最久未用的桶，内存有上限。
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._max_keys = max_keys
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def acquire(self, key: Tuple[str, str], rate: float, burst: int) -> float:
+        return self.acquire_sync(key, rate, burst)
+
+    def acquire_sync(self, key: Tuple[str, str], rate: float, burst: int, now: float = None) -> float:
+        """
+        取一个令牌
+
+        :return: 0 表示放行，否则为需要等待的秒数
+        """
+        now = time.monotonic() if now is None else now
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [float(burst), now, burst / rate]
+            self._evict(now)
+        else:
+            buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        # 最久未用的桶若已按自己的规则闲置到补满，删除不影响结果；
+        # 各规则补满时长不同，遇到未补满的桶即停止，后面的桶留待下次
+        while len(buckets) > 1:
+            key, bucket = next(iter(buckets.items()))
+            if now - bucket[1] < bucket[2]:
+                break
+            del buckets[key]
+        while len(buckets) > self._max_keys:
+            buckets.popitem(last=False)
+
+
+class RedisBackend:
+    """
+    多 worker 共享的令牌桶（Redis + Lua 脚本原子更新）
+
+    redis 不是运行依赖，仅在配置 MATE_RATELIMIT_REDIS_URL 时导入。
+    """
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, prefix: str = "mate:ratelimit:"):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._prefix = prefix
+
+    async def acquire(self, key: Tuple[str, str], rate: float, burst: int) -> float:
+        name = f"{self._prefix}{key[0]}:{key[1]}"
+        wait = await self._script(keys=[name], args=[rate, burst, time.time()])
+        return float(wait)
+
+
+def backend_from_env():
+    """MATE_RATELIMIT_REDIS_URL 配置时使用 Redis 共享计数，否则每个 worker 独立计数"""
+    url = os.environ.get(RATELIMIT_REDIS_ENV)
+    return RedisBackend(url) if url else InMemoryBackend()
+
+
+def _compile(path: str) -> "re.Pattern":
+    return re.compile("^" + re.sub(r"\{[^/]+\}", "[^/]+", path) + "$")
+
+
+class RateLimitMiddleware:
+    """
+    按 (客户端 IP, 路由) 限流的 ASGI 中间件
+
+    接口不校验 token，user_id 查询参数和 X-User-Id 头都由客户端任意填写，
+    按它们计桶等于允许换个 user_id 绕过限流，所以只用连接的客户端 IP。
+    部署在反向代理后时需开启 uvicorn 的 --proxy-headers 并配置 --forwarded-allow-ips，
+    由 uvicorn 从受信任代理的 X-Forwarded-For 中还原 scope["client"]。
+    超限返回 429 并带 Retry-After。设置 MATE_RATELIMIT_DISABLED=1 可关闭（压测用）。
+    """
+
+    def __init__(self, app, rules: List[RateLimitRule] = None, backend=None):
+        self.app = app
+        self.backend = backend or InMemoryBackend()
+        self.enabled = os.environ.get(RATELIMIT_DISABLED_ENV) != "1"
+        self._exact: Dict[Tuple[str, str], RateLimitRule] = {}
+        self._patterns: Dict[str, List[Tuple["re.Pattern", RateLimitRule]]] = {}
+        for rule in DEFAULT_RULES if rules is None else rules:
+            if "{" in rule.path:
+                self._patterns.setdefault(rule.method, []).append((_compile(rule.path), rule))
+            else:
+                self._exact[(rule.method, rule.path)] = rule
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        rule = self._exact.get((method, path))
+        if rule is not None:
+            return rule
+        for pattern, rule in self._patterns.get(method, ()):
+            if pattern.match(path):
+                return rule
+        return None
+
+    @staticmethod
+    def client_key(scope) -> str:
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = self.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self.backend.acquire((self.client_key(scope), rule.path), rule.rate, rule.burst)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "请求过于频繁，请稍后再试"}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# 开销基准：python -m web.ratelimit
+if __name__ == "__main__":
+    import asyncio
+    import timeit
+    from loguru import logger
+
+    async def endpoint(scope, receive, send):
+        return None
+
+    middleware = RateLimitMiddleware(endpoint, rules=[RateLimitRule("GET", "/api/activities/history", 1e9, 10 ** 9)])
+
+    def scope(path: str, client: int) -> dict:
+        return {
+            "type": "http", "method": "GET", "path": path,
+            "query_string": b"user_id=user_1&token=t", "headers": [],
+            "client": (f"10.0.{client // 256}.{client % 256}", 1),
+        }
+
+    unlimited = [scope("/api/activities/abc/details", i) for i in range(1000)]
+    limited = [scope("/api/activities/history", i) for i in range(1000)]
+    loop = asyncio.new_event_loop()
+
+    def run(app, scopes):
+        async def go():
+            for s in scopes:
+                await app(s, None, None)
+        loop.run_until_complete(go())
+
+    number = 200
+    per_call = lambda app, scopes: timeit.timeit(lambda: run(app, scopes), number=number) / number / len(scopes) * 1e6
+    bare = per_call(endpoint, limited)
+    passthrough = per_call(middleware, unlimited)
+    checked = per_call(middleware, limited)
+    logger.info(f"无中间件: {bare:.2f} µs/请求")
+    logger.info(f"未命中规则: {passthrough:.2f} µs/请求 (+{passthrough - bare:.2f})")
+    logger.info(f"令牌桶检查: {checked:.2f} µs/请求 (+{checked - bare:.2f})，桶数 {len(middleware.backend)}")
+
+    backend = InMemoryBackend(max_keys=10_000)
+    for i in range(100_000):
+        backend.acquire_sync(("ip:%d" % i, "/x"), rate=1.0, burst=5, now=float(i))
+    logger.info(f"10 万个不同客户端后桶数: {len(backend)}（上限 10000）")
@@ -1,37 +1,76 @@
 # main.py
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from database.lifetime import init_database, shutdown_database
-from web.api import activities, activities_admin
-app = FastAPI()
-templates = Jinja2Templates(directory="web/templates")
+from loguru import logger
+from database.lifetime import DatabaseSessionMiddleware, init_database, shutdown_database
+from database.leaderboard import run_periodic_rebuild
+from web.ratelimit import RateLimitMiddleware, backend_from_env
+from web.api import activities, activities_admin, users
+
+# 模块导入到应用就绪的耗时预算（毫秒），超出时告警，便于发现启动变慢的改动
+STARTUP_BUDGET_MS = 1500
+
+
+@lru_cache(maxsize=1)
+def get_templates():
+    """首次渲染网页时才加载 Jinja2 模板引擎"""
+    from fastapi.templating import Jinja2Templates
+    return Jinja2Templates(directory="web/templates")
 
-# 全局变量初始化（在 startup 事件中赋值）
-app.state.welcome_message = None
 
-# 注册 startup 事件[1,11](@ref)
-@app.on_event("startup")
-async def init_app():
-    """应用启动时初始化全局数据"""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用启动时初始化全局数据与数据库，关闭时释放连接池"""
     app.state.welcome_message = "欢迎访问 FastAPI 网页！"
     init_database(app)  # 初始化数据库连接
+    app.state.startup_ms = (time.perf_counter() - _IMPORT_STARTED) * 1000
+    logger.info(f"startup_ms={app.state.startup_ms:.1f}")
+    if app.state.startup_ms > STARTUP_BUDGET_MS:
+        logger.warning(f"启动耗时 {app.state.startup_ms:.1f} ms 超出预算 {STARTUP_BUDGET_MS} ms")
     print("✅ 数据库连接已初始化")
     print("✅ 应用启动完成，全局变量已初始化")
+    # 榜单在后台构建并定期全量重算，不阻塞启动
+    leaderboard_task = asyncio.create_task(run_periodic_rebuild(app.state.read_engine))
+    yield
+    # uvicorn 在在途请求处理完毕后才进入此处
+    leaderboard_task.cancel()
+    await shutdown_database(app)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(DatabaseSessionMiddleware)
+# 最后注册的中间件最先执行：超限请求不会打开数据库会话
+app.add_middleware(RateLimitMiddleware, backend=backend_from_env())
+
+# 全局变量初始化（在 lifespan 中赋值）
+app.state.welcome_message = None
+app.state.startup_ms = None
 
 # 网页路由
 @app.get("/", response_class=HTMLResponse)
 async def home_page(request: Request):
     """渲染首页模板并传递全局变量"""
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "index.html",
         {
             "request": request,
-            "message": app.state.welcome_message,  # 使用 startup 初始化的数据
+            "message": app.state.welcome_message,  # 使用 lifespan 初始化的数据
             "now": lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # 添加 now 函数
         }
     )
 
+@app.get("/healthz")
+async def health_check():
+    """健康检查，附带本 worker 的启动耗时"""
+    return {"status": "ok", "startup_ms": app.state.startup_ms}
+
 app.include_router(activities_admin.router)
-app.include_router(activities.router)
\ No newline at end of file
+app.include_router(activities.router)
+app.include_router(users.router)